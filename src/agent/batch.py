@@ -0,0 +1,77 @@
+"""
+Batch translation helpers.
+
+Runs many translate_text() calls concurrently from the async Actor loop.
+Provider functions are blocking (httpx.Client), so each call runs in a worker
+thread; the number of requests actually in flight is governed by the
+per-provider adaptive limiter (see concurrency.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from .translator import MIN_ATTEMPT_SECS, translate_text
+from .validation import MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_RESULT: Dict[str, Any] = {"error": "Cancelled: the run deadline was reached before this item started."}
+
+
+async def translate_batch(
+    texts: list[str],
+    max_workers: int = MAX_CONCURRENCY,
+    references: list[Dict[str, str] | None] | None = None,
+    **kwargs: Any,
+) -> list[Dict[str, Any]]:
+    """
+    Translate a list of texts concurrently.
+
+    Args:
+        texts: Texts to translate. Duplicates are translated once.
+        max_workers: Worker threads; an upper bound on the adaptive in-flight limit.
+        references: Optional translation-memory match per text, for post-editing.
+        **kwargs: Forwarded to translate_text() (languages, provider, api_key, deadline, ...).
+
+    When kwargs carries a `deadline`, items that have not started by the time
+    no attempt could finish are cancelled and returned as errors; items already
+    running are bounded by the same deadline inside translate_text().
+
+    Returns:
+        list: One translate_text() result dict per input text, in input order.
+    """
+    unique: dict[str, Dict[str, str] | None] = {}
+    for text, reference in zip(texts, references or [None] * len(texts)):
+        unique.setdefault(text, reference)
+    if not unique:
+        return []
+
+    deadline = kwargs.get("deadline")
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic() - MIN_ATTEMPT_SECS)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = {
+        text: executor.submit(translate_text, text=text, reference=reference, **kwargs)
+        for text, reference in unique.items()
+    }
+    pending = [asyncio.wrap_future(future) for future in futures.values()]
+    try:
+        await asyncio.wait(pending, timeout=timeout)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    cancelled = sum(future.cancelled() for future in futures.values())
+    if cancelled:
+        logger.warning("Run deadline reached: cancelled %d items that had not started", cancelled)
+
+    by_text = {
+        text: CANCELLED_RESULT if future.cancelled() else future.result()
+        for text, future in futures.items()
+    }
+    return [by_text[text] for text in texts]
@@ -0,0 +1,563 @@
+"""
+Reproducible throughput and cost benchmark.
+
+Runs the bundled multilingual corpus (benchmark_corpus.json: short, medium and
+long texts across many language pairs) through the same path as a multi-item
+run -- scheduler, adaptive limiter, key pool and translate_text() -- and
+prints a JSON report of throughput, latency percentiles, billed characters,
+estimated tokens and translation-memory savings. Keys are sorted so two
+reports can be diffed directly.
+
+Requests go to a local stand-in server that speaks the LibreTranslate,
+OpenAI, Anthropic and Gemini wire formats. It replays a recording (responses
+and latencies captured from the real provider with --record) or, without one,
+echoes the text back after a fixed latency model. Nothing leaves the machine
+unless --record is given.
+
+Usage:
+    python -m src.agent.benchmark --provider openai --model gpt-4o --concurrency 8
+    python -m src.agent.benchmark --provider openai --record openai.json --api-key sk-...
+    python -m src.agent.benchmark --provider openai --replay openai.json --output report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from .concurrency import configure_limiters, get_limiter
+from .keys import KeyPool
+from .memory import TranslationMemory
+from .pricing import calculate_billing
+from .scheduler import estimate_tokens, percentile, run_scheduled, split_text
+from .translator import LANGUAGE_NAMES, SYSTEM_PROMPT, translate_text
+from .validation import MAX_CONCURRENCY, VALID_PROVIDERS, validate_model
+
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = "1.0"
+CORPUS_PATH = Path(__file__).with_name("benchmark_corpus.json")
+CORPUS_SIZES = ("short", "medium", "long")
+
+DEFAULT_LATENCY_MS = 150.0            # synthetic per-request latency
+DEFAULT_LATENCY_PER_KCHAR_MS = 300.0  # synthetic latency per 1,000 characters
+
+GEMINI_TEXT_MARKER = "\n\nText to translate:\n"
+# Language names in LLM prompts, mapped back to the codes recordings are keyed by
+_TARGET_PATTERN = re.compile(
+    re.escape(SYSTEM_PROMPT.split("{target_language}")[0]) + r"(.+?)"
+    + re.escape(SYSTEM_PROMPT.split("{target_language}")[1][:2])
+)
+_SOURCE_PATTERN = re.compile(r"The source language is (.+?)\.")
+_LANGUAGE_CODES = {name: code for code, name in LANGUAGE_NAMES.items()}
+PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)  # per-request overhead of the LLM providers
+
+
+# ---------------------------------------------------------------------------
+# Stand-in provider server
+# ---------------------------------------------------------------------------
+
+def _request_text(provider: str, payload: Dict[str, Any]) -> tuple[str, str, str]:
+    """Extract (source language, target language, text) from a provider request body."""
+    if provider == "libretranslate":
+        return payload.get("source", "auto"), payload.get("target", ""), payload.get("q", "")
+    if provider == "gemini":
+        instructions, _, text = payload["contents"][0]["parts"][0]["text"].partition(GEMINI_TEXT_MARKER)
+    elif provider == "anthropic":
+        instructions, text = payload.get("system", ""), payload["messages"][-1]["content"]
+    else:
+        instructions, text = payload["messages"][0]["content"], payload["messages"][-1]["content"]
+    target = _TARGET_PATTERN.search(instructions)
+    source = _SOURCE_PATTERN.search(instructions)
+    return (
+        _LANGUAGE_CODES.get(source.group(1), source.group(1)) if source else "auto",
+        _LANGUAGE_CODES.get(target.group(1), target.group(1)) if target else "",
+        text,
+    )
+
+
+def _response_body(provider: str, translated: str) -> Dict[str, Any]:
+    """Build a successful provider response body."""
+    if provider == "libretranslate":
+        return {"translatedText": translated}
+    if provider == "openai":
+        return {"choices": [{"message": {"role": "assistant", "content": translated}, "finish_reason": "stop"}]}
+    if provider == "anthropic":
+        return {"content": [{"type": "text", "text": translated}], "stop_reason": "end_turn"}
+    return {"candidates": [{"content": {"parts": [{"text": translated}]}, "finishReason": "STOP"}]}
+
+
+class StandInServer:
+    """
+    Local HTTP server answering translation requests in a provider's format.
+
+    Recorded texts (keyed by source language, target language and text) are
+    answered with the recorded translation after the recorded latency; other texts are echoed back after `latency_ms` plus
+    `latency_per_kchar_ms` per 1,000 characters. With `capacity`, requests beyond
+    that many in flight get 429, like a provider's concurrency limit.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        recording: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] | None = None,
+        latency_ms: float = DEFAULT_LATENCY_MS,
+        latency_per_kchar_ms: float = DEFAULT_LATENCY_PER_KCHAR_MS,
+        capacity: int = 0,
+    ) -> None:
+        self.provider = provider
+        self.recording = recording or {}
+        self.latency_ms = latency_ms
+        self.latency_per_kchar_ms = latency_per_kchar_ms
+        self.capacity = capacity
+        self.requests = 0
+        self.rate_limited = 0
+        self.replayed = 0
+        self.synthesized = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def endpoint(self) -> str:
+        base = f"http://127.0.0.1:{self._server.server_address[1]}"
+        return {
+            "libretranslate": f"{base}/translate",
+            "openai": f"{base}/v1/chat/completions",
+            "anthropic": f"{base}/v1/messages",
+            "gemini": f"{base}/v1beta/models",
+        }[self.provider]
+
+    def __enter__(self) -> "StandInServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, payload: Dict[str, Any]) -> tuple[int, Dict[str, Any]]:
+        """Return (status code, body) for one request."""
+        source_language, target_language, text = _request_text(self.provider, payload)
+        recorded = self.recording.get(source_language, {}).get(target_language, {}).get(text)
+        with self._lock:
+            self.requests += 1
+            if self.capacity and self._in_flight >= self.capacity:
+                self.rate_limited += 1
+                return 429, {"error": "Too many requests in flight."}
+            self._in_flight += 1
+            if recorded:
+                self.replayed += 1
+            else:
+                self.synthesized += 1
+        try:
+            if recorded:
+                translated, latency = recorded["translated_text"], recorded["latency_secs"]
+            else:
+                translated = text
+                latency = (self.latency_ms + self.latency_per_kchar_ms * len(text) / 1000) / 1000
+            time.sleep(latency)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return 200, _response_body(self.provider, translated)
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                status, body = server.respond(json.loads(self.rfile.read(length) or b"{}"))
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# Benchmark run
+# ---------------------------------------------------------------------------
+
+def load_corpus(path: Path = CORPUS_PATH, sizes: tuple[str, ...] = CORPUS_SIZES) -> Dict[str, Any]:
+    """Load the corpus, keeping only items of the given sizes."""
+    raw = path.read_bytes()
+    corpus = json.loads(raw)
+    items = [item for item in corpus["items"] if item["size"] in sizes]
+    return {
+        "version": corpus.get("version", ""),
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "items": items,
+    }
+
+
+def _plan_cache(items: list[Dict[str, Any]]) -> set[str]:
+    """
+    Return the ids of items the translation memory can serve.
+
+    An item is served from memory when an earlier item of the same language pair
+    is identical or differs only in numbers. Planning this up front, in corpus
+    order, keeps the savings independent of request timing.
+    """
+    memories: dict[tuple[str, str], TranslationMemory] = {}
+    cached: set[str] = set()
+    for item in items:
+        memory = memories.setdefault((item["source_language"], item["target_language"]), TranslationMemory())
+        match = memory.lookup(item["text"])
+        if match and match["translation"]:
+            cached.add(item["id"])
+        else:
+            memory.add(item["text"], item["text"])
+    return cached
+
+
+def _input_tokens(provider: str, text: str) -> int:
+    """Estimated request tokens, including the system prompt for LLM providers."""
+    return estimate_tokens(text) + (PROMPT_TOKENS if provider != "libretranslate" else 0)
+
+
+def _latency_summary(values: list[float]) -> Dict[str, float]:
+    return {
+        "p50": round(percentile(values, 50), 3),
+        "p90": round(percentile(values, 90), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values, default=0.0), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def _no_server() -> Iterator[None]:
+    yield None
+
+
+async def run_benchmark(
+    provider: str,
+    model: str | None = None,
+    concurrency: int = 4,
+    adaptive: bool = True,
+    keys: int = 1,
+    key_requests_per_minute: int | None = None,
+    max_retries: int = 3,
+    timeout: int = 30,
+    deadline_secs: int | None = None,
+    translation_memory: bool = False,
+    sizes: tuple[str, ...] = CORPUS_SIZES,
+    corpus_path: Path = CORPUS_PATH,
+    replay: Dict[str, Any] | None = None,
+    record: Dict[str, Any] | None = None,
+    api_keys: list[str] | None = None,
+    endpoint: str | None = None,
+    latency_ms: float = DEFAULT_LATENCY_MS,
+    latency_per_kchar_ms: float = DEFAULT_LATENCY_PER_KCHAR_MS,
+    server_capacity: int = 0,
+) -> Dict[str, Any]:
+    """
+    Run the corpus through one provider configuration and return the report.
+
+    Args:
+        provider, model, concurrency, adaptive, key_requests_per_minute,
+        max_retries, timeout, deadline_secs: As the Actor inputs of the same name.
+        keys: Number of pooled API keys to simulate against the stand-in server.
+        translation_memory: Serve repeated and numbers-only variants from memory.
+        sizes: Corpus size classes to include.
+        replay: Recording to replay ({'provider', 'model', 'responses'}, with
+            responses[source_language][target_language][text]).
+        record: If given, call the real provider with `api_keys` (and optional
+            `endpoint`) and fill record['responses'] with the results.
+        latency_ms, latency_per_kchar_ms, server_capacity: Stand-in server
+            latency model and 429 threshold for unrecorded texts.
+    """
+    resolved_model, model_err = validate_model(provider, model)
+    if model_err:
+        raise ValueError(model_err)
+    if replay and replay.get("provider") != provider:
+        raise ValueError(f"Recording was made with provider '{replay.get('provider')}', not '{provider}'.")
+    if replay and replay.get("model") != resolved_model:
+        raise ValueError(f"Recording was made with model '{replay.get('model')}', not '{resolved_model}'.")
+
+    corpus = load_corpus(corpus_path, sizes)
+    items = corpus["items"]
+    cached = _plan_cache(items) if translation_memory else set()
+    scheduled = [item for item in items if item["id"] not in cached]
+
+    live = record is not None
+    pool = KeyPool(api_keys if live else [f"benchmark-key-{n + 1}" for n in range(keys)], key_requests_per_minute)
+    configure_limiters(initial=concurrency, adaptive=adaptive)
+
+    lock = threading.Lock()
+    call_latencies: list[float] = []
+    tokens = {"input": 0, "output": 0}
+    results: dict[str, Dict[str, Any]] = {}
+    latencies: dict[str, float] = {}
+
+    server_cm = _no_server() if live else StandInServer(
+        provider,
+        recording=(replay or {}).get("responses"),
+        latency_ms=latency_ms,
+        latency_per_kchar_ms=latency_per_kchar_ms,
+        capacity=server_capacity,
+    )
+    with server_cm as server:
+        target = endpoint if live else server.endpoint
+        started = time.monotonic()
+        deadline = started + deadline_secs if deadline_secs else None
+
+        def translate(item: Dict[str, Any], text: str) -> Dict[str, Any]:
+            call_started = time.monotonic()
+            result = translate_text(
+                text=text,
+                source_language=item["source_language"],
+                target_language=item["target_language"],
+                provider=provider,
+                api_key=pool.keys[0],
+                model=resolved_model,
+                endpoint=target,
+                timeout=timeout,
+                max_retries=max_retries,
+                deadline=deadline,
+                key_pool=pool,
+            )
+            elapsed = time.monotonic() - call_started
+            with lock:
+                call_latencies.append(elapsed)
+                if not result.get("error"):
+                    tokens["input"] += _input_tokens(provider, text)
+                    tokens["output"] += estimate_tokens(result["translated_text"])
+                    if live:
+                        pair = record["responses"].setdefault(item["source_language"], {})
+                        pair.setdefault(item["target_language"], {})[text] = {
+                            "translated_text": result["translated_text"],
+                            "latency_secs": round(elapsed, 3),
+                        }
+            return result
+
+        async def collect(item: Dict[str, Any], result: Dict[str, Any], latency: float) -> None:
+            results[item["id"]] = result
+            latencies[item["id"]] = latency
+
+        limiter = get_limiter(provider, resolved_model, target)
+        by_priority = await run_scheduled(
+            scheduled,
+            translate,
+            capacity=lambda: limiter.snapshot()["limit"],
+            on_result=collect,
+            deadline=deadline,
+            size_by="characters" if provider == "libretranslate" else "tokens",
+            max_workers=MAX_CONCURRENCY,
+        )
+        wall_time = time.monotonic() - started
+
+    # Fill memory-served items from the translations actually produced
+    savings = {"translation_memory_hits": 0, "requests_saved": 0, "characters_saved": 0,
+               "billing_saved": 0.0, "estimated_tokens_saved": 0}
+    if cached:
+        memories: dict[tuple[str, str], TranslationMemory] = {}
+        for item in items:
+            memory = memories.setdefault((item["source_language"], item["target_language"]), TranslationMemory())
+            if item["id"] in cached:
+                match = memory.lookup(item["text"])
+                if not (match and match["translation"]):
+                    results[item["id"]] = {"error": "Translation memory could not reuse the earlier translation."}
+                    continue
+                results[item["id"]] = {"translated_text": match["translation"], "finish_reason": "translation-memory"}
+                billing = calculate_billing(item["text"], provider)
+                savings["translation_memory_hits"] += 1
+                chunks = split_text(item["text"])
+                savings["requests_saved"] += len(chunks)
+                savings["characters_saved"] += billing["character_count"]
+                savings["billing_saved"] += billing["amount"]
+                savings["estimated_tokens_saved"] += (
+                    sum(_input_tokens(provider, chunk) for chunk in chunks) + estimate_tokens(match["translation"])
+                )
+            elif not results.get(item["id"], {}).get("error"):
+                memory.add(item["text"], results[item["id"]]["translated_text"])
+        savings["billing_saved"] = round(savings["billing_saved"], 6)
+
+    errors: dict[str, int] = {}
+    for result in results.values():
+        if result.get("error"):
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+    succeeded = [item for item in scheduled if not results[item["id"]].get("error")]
+    characters = sum(len(item["text"]) for item in succeeded)
+    requests = server.requests if server else sum(key["requests"] for key in pool.snapshot())
+
+    return {
+        "report_version": REPORT_VERSION,
+        "config": {
+            "provider": provider,
+            "model": resolved_model,
+            "mode": "record" if live else "replay" if replay else "synthetic",
+            "concurrency": concurrency,
+            "adaptive_concurrency": adaptive,
+            "keys": len(pool.keys),
+            "key_requests_per_minute": key_requests_per_minute,
+            "max_retries": max_retries,
+            "timeout_secs": timeout,
+            "deadline_secs": deadline_secs,
+            "translation_memory": translation_memory,
+            "sizes": list(sizes),
+            "latency_ms": None if live else latency_ms,
+            "latency_per_kchar_ms": None if live else latency_per_kchar_ms,
+            "server_capacity": None if live else server_capacity,
+        },
+        "corpus": {
+            "version": corpus["version"],
+            "sha256": corpus["sha256"],
+            "items": len(items),
+            "characters": sum(len(item["text"]) for item in items),
+            "language_pairs": len({(item["source_language"], item["target_language"]) for item in items}),
+        },
+        "results": {
+            "items": len(items),
+            "succeeded": len(items) - sum(errors.values()),
+            "failed": sum(errors.values()),
+            "errors": errors,
+            "requests": requests,
+            "rate_limited": server.rate_limited if server else None,
+            "replayed": server.replayed if server else None,
+            "synthesized": server.synthesized if server else None,
+        },
+        "wall_time_secs": round(wall_time, 3),
+        "throughput": {
+            "items_per_sec": round(len(succeeded) / wall_time, 3) if wall_time else 0.0,
+            "characters_per_sec": round(characters / wall_time, 1) if wall_time else 0.0,
+            "requests_per_sec": round(requests / wall_time, 3) if wall_time else 0.0,
+        },
+        "latency_secs": {
+            "item": _latency_summary(list(latencies.values())),
+            "request": _latency_summary(call_latencies),
+            "by_size": {
+                size: _latency_summary([latencies[i["id"]] for i in scheduled if i["size"] == size and i["id"] in latencies])
+                for size in sizes
+            },
+            "by_priority": by_priority,
+        },
+        "billing": {
+            "billed_characters": sum(r.get("character_count", 0) for r in results.values()),
+            "billing_amount": round(sum(r.get("billing_amount", 0.0) for r in results.values()), 6),
+        },
+        "estimated_tokens": {**tokens, "total": tokens["input"] + tokens["output"]},
+        "savings": savings,
+        "concurrency": limiter.snapshot(),
+        "api_keys": pool.snapshot(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.agent.benchmark",
+        description="Benchmark a provider configuration on the bundled corpus and print a JSON report.",
+    )
+    parser.add_argument("--provider", choices=sorted(VALID_PROVIDERS), default="libretranslate")
+    parser.add_argument("--model", help="Model to benchmark (default: the provider's default model).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Starting in-flight limit (default: 4).")
+    parser.add_argument("--no-adaptive", action="store_true", help="Keep the in-flight limit fixed.")
+    parser.add_argument("--keys", type=int, default=1, help="Number of pooled API keys to simulate (default: 1).")
+    parser.add_argument("--key-rpm", type=int, help="Requests-per-minute budget per key.")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--timeout", type=int, default=30, help="Per-attempt timeout in seconds.")
+    parser.add_argument("--deadline-secs", type=int, help="Time budget for the whole run.")
+    parser.add_argument("--translation-memory", action="store_true",
+                        help="Serve repeated and numbers-only variants from the translation memory.")
+    parser.add_argument("--sizes", default=",".join(CORPUS_SIZES),
+                        help="Comma-separated corpus size classes (default: short,medium,long).")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="Corpus JSON file.")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS,
+                        help="Stand-in server latency per request for unrecorded texts.")
+    parser.add_argument("--latency-per-kchar-ms", type=float, default=DEFAULT_LATENCY_PER_KCHAR_MS,
+                        help="Stand-in server latency per 1,000 characters for unrecorded texts.")
+    parser.add_argument("--server-capacity", type=int, default=0,
+                        help="Requests in flight before the stand-in server answers 429 (0 = unlimited).")
+    parser.add_argument("--replay", type=Path, help="Recording to replay through the stand-in server.")
+    parser.add_argument("--record", type=Path, help="Call the real provider and save a recording here.")
+    parser.add_argument("--api-key", action="append", default=[], help="Real API key for --record (repeatable).")
+    parser.add_argument("--endpoint", help="Real provider endpoint for --record.")
+    parser.add_argument("--output", type=Path, help="Write the report here instead of stdout.")
+    args = parser.parse_args(argv)
+
+    args.sizes = tuple(size.strip() for size in args.sizes.split(",") if size.strip())
+    if not args.sizes or set(args.sizes) - set(CORPUS_SIZES):
+        parser.error(f"--sizes must be a subset of: {', '.join(CORPUS_SIZES)}.")
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be combined.")
+    if args.record and not args.api_key:
+        parser.error("--record needs at least one --api-key.")
+    if not 1 <= args.concurrency <= MAX_CONCURRENCY:
+        parser.error(f"--concurrency must be between 1 and {MAX_CONCURRENCY}.")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the benchmark CLI. Returns 1 if any corpus item failed, else 0."""
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    args = _parse_args(argv)
+
+    replay = json.loads(args.replay.read_text(encoding="utf-8")) if args.replay else None
+    record = {"provider": args.provider, "model": args.model, "responses": {}} if args.record else None
+
+    try:
+        report = asyncio.run(run_benchmark(
+            args.provider,
+            model=args.model,
+            concurrency=args.concurrency,
+            adaptive=not args.no_adaptive,
+            keys=args.keys,
+            key_requests_per_minute=args.key_rpm,
+            max_retries=args.max_retries,
+            timeout=args.timeout,
+            deadline_secs=args.deadline_secs,
+            translation_memory=args.translation_memory,
+            sizes=args.sizes,
+            corpus_path=args.corpus,
+            replay=replay,
+            record=record,
+            api_keys=args.api_key,
+            endpoint=args.endpoint,
+            latency_ms=args.latency_ms,
+            latency_per_kchar_ms=args.latency_per_kchar_ms,
+            server_capacity=args.server_capacity,
+        ))
+    except ValueError as exc:
+        logger.error("%s", exc)
+        return 2
+
+    if record is not None:
+        record["model"] = report["config"]["model"]
+        args.record.write_text(json.dumps(record, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+        logger.warning("Recorded %d responses to %s", len(record["responses"]), args.record)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    return 1 if report["results"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
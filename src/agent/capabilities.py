@@ -0,0 +1,170 @@
+"""
+Provider capability discovery.
+
+Fetches LibreTranslate's supported language pairs (/languages) and the model
+lists of the LLM providers, so unsupported language pairs and unavailable models
+are rejected locally before any translation request is sent. When discovery is
+unavailable, a built-in snapshot is used instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict
+
+import httpx
+
+from .translator import DEFAULT_ENDPOINTS
+from .validation import MODEL_WHITELIST, sanitize_error
+
+logger = logging.getLogger(__name__)
+
+CAPABILITIES_TTL_SECS = 24 * 60 * 60
+DISCOVERY_TIMEOUT_SECS = 10
+
+# Languages offered by libretranslate.com (any-to-any via English pivot)
+LIBRETRANSLATE_LANGUAGES_SNAPSHOT = (
+    "ar", "az", "bg", "bn", "ca", "cs", "da", "de", "el", "en", "eo", "es", "et", "eu",
+    "fa", "fi", "fr", "ga", "gl", "he", "hi", "hu", "id", "it", "ja", "ko", "lt", "lv",
+    "ms", "nb", "nl", "pl", "pt", "pt-br", "ro", "ru", "sk", "sl", "sq", "sr", "sv", "th",
+    "tl", "tr", "uk", "ur", "vi", "zh", "zh-hans", "zh-hant",
+)
+
+
+def snapshot_capabilities(provider: str, endpoint: str | None = None) -> Dict[str, Any]:
+    """
+    Return the built-in capability snapshot for a provider.
+
+    The LibreTranslate language list is libretranslate.com's; for a self-hosted
+    endpoint no languages are assumed, so the language-pair check is skipped.
+    """
+    if provider == "libretranslate":
+        if endpoint and endpoint != DEFAULT_ENDPOINTS[provider]:
+            return {"languages": None, "models": None, "fetched_at": 0.0, "origin": "snapshot"}
+        languages = {
+            code: [target for target in LIBRETRANSLATE_LANGUAGES_SNAPSHOT if target != code]
+            for code in LIBRETRANSLATE_LANGUAGES_SNAPSHOT
+        }
+        return {"languages": languages, "models": None, "fetched_at": 0.0, "origin": "snapshot"}
+    return {
+        "languages": None,
+        "models": sorted(MODEL_WHITELIST.get(provider, set())),
+        "fetched_at": 0.0,
+        "origin": "snapshot",
+    }
+
+
+def is_fresh(capabilities: Dict[str, Any] | None) -> bool:
+    """True if cached capabilities were discovered within CAPABILITIES_TTL_SECS."""
+    return bool(
+        capabilities
+        and capabilities.get("origin") == "discovered"
+        and time.time() - capabilities.get("fetched_at", 0.0) < CAPABILITIES_TTL_SECS
+    )
+
+
+def _discovery_url(provider: str, endpoint: str | None) -> str | None:
+    url = endpoint or DEFAULT_ENDPOINTS[provider]
+    if provider == "libretranslate":
+        return url.rsplit("/translate", 1)[0] + "/languages" if url.endswith("/translate") else None
+    if provider == "openai":
+        return url.rsplit("/chat/completions", 1)[0] + "/models" if url.endswith("/chat/completions") else None
+    if provider == "anthropic":
+        return url.rsplit("/messages", 1)[0] + "/models?limit=1000" if url.endswith("/messages") else None
+    return url  # gemini: the models base URL is also the list endpoint
+
+
+def fetch_capabilities(
+    provider: str,
+    api_key: str | None = None,
+    endpoint: str | None = None,
+) -> Dict[str, Any] | None:
+    """
+    Discover a provider's language pairs or models.
+
+    Returns:
+        dict | None: {
+            'languages': {source: [targets]} | None,  # LibreTranslate only
+            'models': [model ids] | None,              # LLM providers only
+            'fetched_at': float,                        # epoch seconds
+            'origin': 'discovered',
+        }, or None if discovery failed.
+    """
+    url = _discovery_url(provider, endpoint)
+    if not url:
+        return None
+
+    headers: dict[str, str] = {}
+    params: dict[str, str] = {}
+    if provider == "openai":
+        headers["Authorization"] = f"Bearer {api_key}"
+    elif provider == "anthropic":
+        headers["x-api-key"] = api_key or ""
+        headers["anthropic-version"] = "2023-06-01"
+    elif provider == "gemini":
+        params = {"key": api_key or "", "pageSize": "1000"}
+
+    try:
+        with httpx.Client(timeout=DISCOVERY_TIMEOUT_SECS) as client:
+            response = client.get(url, headers=headers, params=params)
+        if response.status_code != 200:
+            logger.warning("%s capability discovery returned %s", provider, response.status_code)
+            return None
+        data = response.json()
+    except (httpx.HTTPError, ValueError) as exc:
+        logger.warning(sanitize_error(f"{provider} capability discovery failed: {exc}", api_key))
+        return None
+
+    capabilities: Dict[str, Any] = {"languages": None, "models": None, "fetched_at": time.time(), "origin": "discovered"}
+    try:
+        if provider == "libretranslate":
+            capabilities["languages"] = {
+                item["code"].lower(): [target.lower() for target in item.get("targets", [])]
+                for item in data if isinstance(item, dict) and item.get("code")
+            }
+        elif provider == "gemini":
+            capabilities["models"] = [
+                item["name"].removeprefix("models/") for item in data.get("models", []) if item.get("name")
+            ]
+        else:
+            capabilities["models"] = [item["id"] for item in data.get("data", []) if item.get("id")]
+    except (AttributeError, KeyError, TypeError):
+        logger.warning("%s capability discovery returned an unexpected response", provider)
+        return None
+
+    if not (capabilities["languages"] or capabilities["models"]):
+        return None
+    return capabilities
+
+
+def check_language_pair(capabilities: Dict[str, Any], source_language: str, target_language: str) -> str | None:
+    """Return error if the provider does not support the language pair, else None."""
+    languages = capabilities.get("languages")
+    if not languages:
+        return None  # LLM providers translate between any languages
+
+    if target_language not in languages and not any(target_language in t for t in languages.values()):
+        return f"Target language '{target_language}' is not supported by this LibreTranslate instance."
+    if source_language == "auto":
+        return None
+    if source_language not in languages:
+        return f"Source language '{source_language}' is not supported by this LibreTranslate instance."
+    if target_language not in languages[source_language]:
+        return f"Language pair '{source_language}' -> '{target_language}' is not supported by this LibreTranslate instance."
+    return None
+
+
+def check_model(capabilities: Dict[str, Any], provider: str, model: str) -> str | None:
+    """Return error if the model is not available from the provider, else None."""
+    models = capabilities.get("models")
+    if not models or not model:
+        return None
+    # Gateways such as OpenRouter list vendor-prefixed ids ('openai/gpt-4o-mini')
+    models = {m.rsplit("/", 1)[-1] for m in models if isinstance(m, str)}
+    if model in models:
+        return None
+    # Aliases such as 'claude-3-5-haiku-latest' are not listed; accept them if a dated version is
+    if model.endswith("-latest") and any(m.startswith(model.removesuffix("latest")) for m in models):
+        return None
+    return f"Model '{model}' is not available from provider '{provider}' for this API key."
@@ -0,0 +1,149 @@
+"""
+Adaptive concurrency control for provider requests.
+
+One AIMD (additive-increase / multiplicative-decrease) limiter per
+provider/model/endpoint, similar to TCP congestion control: the in-flight
+limit grows slowly while latency is stable and is cut sharply on 429s,
+5xx responses, transport errors or latency inflation.
+
+Latency inflation is judged against a baseline per request-size bucket, since
+LLM latency grows steeply with text length. Every sample, inflated or not,
+feeds the baseline, so a lasting latency shift is absorbed after a few
+requests instead of being read as congestion forever.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Dict
+from urllib.parse import urlparse
+
+from .validation import MAX_CONCURRENCY
+
+DECREASE_FACTOR = 0.5       # multiplicative decrease on congestion
+LATENCY_INFLATION = 2.0     # sample > 2x baseline counts as congestion
+LATENCY_ALPHA = 0.1         # EWMA smoothing for the latency baselines
+MIN_LATENCY_SAMPLES = 5     # samples needed in a size bucket before latency can trigger a decrease
+BUCKETS_PER_DOUBLING = 4    # size buckets per doubling of request size (~19% apart)
+BUCKET_BASE_CHARS = 100     # request size that starts the first doubling
+
+
+class AdaptiveLimiter:
+    """Thread-safe AIMD limit on in-flight requests to one provider/model/endpoint."""
+
+    def __init__(self, initial: int = 4, maximum: int = MAX_CONCURRENCY, adaptive: bool = True) -> None:
+        self.limit = float(max(1, min(initial, maximum)))
+        self.maximum = maximum
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.decreases = 0
+        self.requests = 0
+        self._baselines: dict[int, list[float]] = {}  # size bucket -> [latency EWMA, samples]
+        self._round_trip = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Block until an in-flight slot is available. Returns False if `timeout` expired first."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def release(self, status_code: int | None, latency: float, size: int = 0) -> None:
+        """
+        Free a slot and adjust the limit from the request outcome.
+
+        Args:
+            status_code: HTTP status, or None if the request failed at transport level.
+            latency: Request duration in seconds.
+            size: Request size in characters (selects the latency baseline).
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if self.adaptive:
+                self._adjust(status_code, latency, size)
+            self._cond.notify_all()
+
+    def cancel(self) -> None:
+        """Free a slot whose request was never sent, without adjusting the limit."""
+        with self._cond:
+            self.in_flight -= 1
+            self.requests -= 1
+            self._cond.notify_all()
+
+    def _adjust(self, status_code: int | None, latency: float, size: int) -> None:
+        congested = status_code is None or status_code == 429 or status_code >= 500
+
+        if not congested and status_code < 400:
+            bucket = int(BUCKETS_PER_DOUBLING * math.log2(1 + size / BUCKET_BASE_CHARS))
+            baseline = self._baselines.setdefault(bucket, [latency, 0])
+            if baseline[1] >= MIN_LATENCY_SAMPLES and latency > LATENCY_INFLATION * baseline[0]:
+                congested = True
+            # Inflated samples are absorbed too, so the baseline follows lasting shifts
+            baseline[0] = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * baseline[0]
+            baseline[1] += 1
+            self._round_trip = latency if not self._round_trip else (
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self._round_trip
+            )
+
+        now = time.monotonic()
+        if congested:
+            # At most one decrease per round trip, so a burst of failures from
+            # requests already in flight does not collapse the limit to 1.
+            if now - self._last_decrease >= max(self._round_trip, 0.1):
+                self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                self.decreases += 1
+                self._last_decrease = now
+        elif status_code < 400 and self.in_flight + 1 >= int(self.limit) - 1:
+            # Grow only while the limit is in use, so an idle phase cannot
+            # raise it to the maximum and release the next burst all at once
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return current limiter metrics."""
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "decreases": self.decreases,
+                "adaptive": self.adaptive,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Registry (one limiter per provider/model/endpoint host)
+# ---------------------------------------------------------------------------
+
+_LIMITERS: dict[str, AdaptiveLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+_DEFAULTS: Dict[str, Any] = {"initial": 4, "adaptive": True}
+
+
+def _limiter_key(provider: str, model: str | None, endpoint: str | None) -> str:
+    host = urlparse(endpoint).hostname if endpoint else ""
+    return f"{provider}:{model or '-'}@{host or 'default'}"
+
+
+def configure_limiters(initial: int = 4, adaptive: bool = True) -> None:
+    """Set the starting limit and mode for limiters created after this call."""
+    with _LIMITERS_LOCK:
+        _DEFAULTS.update(initial=initial, adaptive=adaptive)
+
+
+def get_limiter(provider: str, model: str | None = None, endpoint: str | None = None) -> AdaptiveLimiter:
+    """Return the shared limiter for a provider/model/endpoint, creating it if needed."""
+    key = _limiter_key(provider, model, endpoint)
+    with _LIMITERS_LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = AdaptiveLimiter(**_DEFAULTS)
+        return _LIMITERS[key]
+
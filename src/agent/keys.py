@@ -0,0 +1,135 @@
+"""
+API key pooling.
+
+Schedules provider requests across several API keys so a run's throughput is
+not capped by one key's rate limit. Each key has its own request budget;
+requests go to the least-loaded usable key. A key rejected with 401/403 is
+benched for the rest of the run, and a key that gets 429 cools down.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict
+
+COOLDOWN_BASE_SECS = 2.0   # first 429 cooldown, doubled per consecutive 429
+COOLDOWN_MAX_SECS = 60.0
+
+
+class KeyPool:
+    """Thread-safe scheduler over the API keys of one provider."""
+
+    def __init__(self, keys: list[str], requests_per_minute: int | None = None) -> None:
+        self.keys = list(dict.fromkeys(key for key in keys if key is not None))
+        self.requests_per_minute = requests_per_minute
+        now = time.monotonic()
+        self._state = [
+            {
+                "in_flight": 0,
+                "requests": 0,
+                "benched": False,
+                "cooldown_until": 0.0,
+                "strikes": 0,
+                "tokens": float(requests_per_minute or 0),
+                "refilled_at": now,
+            }
+            for _ in self.keys
+        ]
+        self._cond = threading.Condition()
+
+    def exhausted(self) -> bool:
+        """True if every key has been benched."""
+        with self._cond:
+            return all(state["benched"] for state in self._state)
+
+    def has_ready_key(self) -> bool:
+        """True if some usable key could take a request right now."""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return any(
+                not state["benched"] and self._ready_at(state, now) <= now for state in self._state
+            )
+
+    def _refill(self, now: float) -> None:
+        if not self.requests_per_minute:
+            return
+        rate = self.requests_per_minute / 60
+        for state in self._state:
+            state["tokens"] = min(
+                float(self.requests_per_minute),
+                state["tokens"] + (now - state["refilled_at"]) * rate,
+            )
+            state["refilled_at"] = now
+
+    def _ready_at(self, state: Dict[str, Any], now: float) -> float:
+        """Earliest time the key can take another request."""
+        ready = max(now, state["cooldown_until"])
+        if self.requests_per_minute and state["tokens"] < 1:
+            ready = max(ready, now + (1 - state["tokens"]) * 60 / self.requests_per_minute)
+        return ready
+
+    def acquire(self, timeout: float | None = None) -> str | None:
+        """
+        Reserve the least-loaded usable key, waiting for cooldowns and budgets.
+
+        Returns None if every key is benched or `timeout` expires first.
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                usable = [i for i, state in enumerate(self._state) if not state["benched"]]
+                if not usable:
+                    return None
+
+                ready = [i for i in usable if self._ready_at(self._state[i], now) <= now]
+                if ready:
+                    index = min(ready, key=lambda i: (self._state[i]["in_flight"], self._state[i]["requests"]))
+                    state = self._state[index]
+                    state["in_flight"] += 1
+                    state["requests"] += 1
+                    if self.requests_per_minute:
+                        state["tokens"] -= 1
+                    return self.keys[index]
+
+                wake = min(self._ready_at(self._state[i], now) for i in usable)
+                if give_up is not None:
+                    if now >= give_up:
+                        return None
+                    wake = min(wake, give_up)
+                self._cond.wait(wake - now)
+
+    def release(self, key: str, status_code: int | None) -> None:
+        """Return a key and record the response status (None for transport errors)."""
+        with self._cond:
+            state = self._state[self.keys.index(key)]
+            state["in_flight"] -= 1
+            if status_code in (401, 403):
+                state["benched"] = True
+            elif status_code == 429:
+                state["strikes"] += 1
+                # A single key relies on the provider's own retry backoff instead
+                if len(self.keys) > 1:
+                    cooldown = min(COOLDOWN_BASE_SECS * 2 ** (state["strikes"] - 1), COOLDOWN_MAX_SECS)
+                    state["cooldown_until"] = time.monotonic() + cooldown
+            elif status_code is not None and status_code < 400:
+                state["strikes"] = 0
+            self._cond.notify_all()
+
+    def snapshot(self) -> list[Dict[str, Any]]:
+        """Per-key metrics. Keys are identified by position, never by value."""
+        with self._cond:
+            now = time.monotonic()
+            return [
+                {
+                    "key": f"key-{index + 1}",
+                    "requests": state["requests"],
+                    "in_flight": state["in_flight"],
+                    "benched": state["benched"],
+                    "cooling_down": state["cooldown_until"] > now,
+                }
+                for index, state in enumerate(self._state)
+            ]
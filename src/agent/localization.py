@@ -0,0 +1,397 @@
+"""
+Localization file adapters for incremental translation.
+
+Parses gettext PO, XLIFF (1.2 / 2.0), SubRip (SRT) and WebVTT files into
+translatable segments, diffs them against the previously translated version,
+and writes the translated file back with IDs, plural forms and timing codes intact.
+"""
+
+from __future__ import annotations
+
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict
+
+# Separators used to build segment keys (neither can appear in real IDs)
+CONTEXT_SEPARATOR = "\x04"  # gettext's own msgctxt separator
+PLURAL_SUFFIX = "\x00plural"
+
+
+# ---------------------------------------------------------------------------
+# gettext PO
+# ---------------------------------------------------------------------------
+
+PO_KEYWORD_PATTERN = re.compile(r'^(msgctxt|msgid_plural|msgid|msgstr(?:\[(\d+)\])?)\s+(".*")\s*$')
+PO_NPLURALS_PATTERN = re.compile(r"nplurals\s*=\s*(\d+)")
+
+PO_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+
+def _po_unquote(quoted: str) -> str:
+    """Decode a single quoted PO string literal."""
+    body = quoted.strip()[1:-1]
+    return re.sub(r"\\(.)", lambda m: PO_ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def _po_quote(text: str) -> str:
+    """Encode text as a quoted PO string literal."""
+    escaped = (
+        text.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\t", "\\t")
+        .replace("\r", "\\r")
+        .replace("\n", "\\n")
+    )
+    return f'"{escaped}"'
+
+
+def _po_msgstr_lines(keyword: str, text: str) -> list[str]:
+    """Render a msgstr field, wrapping multi-line text the way msgmerge does."""
+    lines = text.splitlines(keepends=True)
+    if len(lines) <= 1:
+        return [f"{keyword} {_po_quote(text)}"]
+    return [f'{keyword} ""'] + [_po_quote(line) for line in lines]
+
+
+def _parse_po(content: str) -> list[Any]:
+    """
+    Split a PO file into chunks.
+
+    Each chunk is either a raw line (str) that is passed through unchanged, or an
+    entry dict with the lines preceding msgstr ('head'), the decoded fields and
+    the msgstr plural indices present in the file.
+    """
+    chunks: list[Any] = []
+    entry: dict[str, Any] | None = None
+    field: str | None = None
+
+    def _flush() -> None:
+        nonlocal entry, field
+        if entry is not None:
+            if entry["msgid"] is None:
+                chunks.extend(entry["head"])  # comments only (e.g. obsolete #~ entries)
+            else:
+                chunks.append(entry)
+        entry, field = None, None
+
+    for line in content.splitlines():
+        stripped = line.strip()
+
+        if not stripped:
+            _flush()
+            chunks.append(line)
+            continue
+
+        match = PO_KEYWORD_PATTERN.match(stripped)
+        if stripped.startswith("#") or match:
+            keyword = match.group(1) if match else ""
+            if entry is not None and (
+                (entry["msgstr"] and not keyword.startswith("msgstr"))
+                or (keyword in ("msgctxt", "msgid") and entry["msgid"] is not None)
+            ):
+                _flush()
+            if entry is None:
+                entry = {"head": [], "msgctxt": None, "msgid": None, "msgid_plural": None,
+                         "msgstr": {}, "msgstr_lines": []}
+
+        if stripped.startswith("#"):
+            entry["head"].append(line)
+            field = None
+        elif match:
+            keyword, index, quoted = match.groups()
+            if keyword.startswith("msgstr"):
+                field = f"msgstr:{index or 0}"
+                entry["msgstr"][int(index or 0)] = _po_unquote(quoted)
+                entry["msgstr_lines"].append(line)
+            else:
+                field = keyword
+                entry[keyword] = _po_unquote(quoted)
+                entry["head"].append(line)
+        elif stripped.startswith('"') and entry is not None and field:
+            value = _po_unquote(stripped)
+            if field.startswith("msgstr:"):
+                entry["msgstr"][int(field.split(":")[1])] += value
+                entry["msgstr_lines"].append(line)
+            else:
+                entry[field] += value
+                entry["head"].append(line)
+        else:
+            _flush()
+            chunks.append(line)
+
+    _flush()
+    return chunks
+
+
+def _po_entry_key(entry: dict[str, Any]) -> str:
+    if entry["msgctxt"] is not None:
+        return f"{entry['msgctxt']}{CONTEXT_SEPARATOR}{entry['msgid']}"
+    return entry["msgid"]
+
+
+def _po_is_header(entry: dict[str, Any]) -> bool:
+    return entry["msgid"] == "" and entry["msgctxt"] is None
+
+
+def _extract_po(content: str) -> list[Dict[str, str]]:
+    segments: list[Dict[str, str]] = []
+    for chunk in _parse_po(content):
+        if isinstance(chunk, str) or _po_is_header(chunk):
+            continue
+        key = _po_entry_key(chunk)
+        segments.append({"key": key, "source": chunk["msgid"]})
+        if chunk["msgid_plural"] is not None:
+            segments.append({"key": key + PLURAL_SUFFIX, "source": chunk["msgid_plural"]})
+    return segments
+
+
+def _apply_po(content: str, translations: Dict[str, str]) -> str:
+    chunks = _parse_po(content)
+
+    nplurals = 2
+    for chunk in chunks:
+        if isinstance(chunk, dict) and _po_is_header(chunk):
+            header = chunk["msgstr"].get(0, "")
+            found = PO_NPLURALS_PATTERN.search(header)
+            if found:
+                nplurals = int(found.group(1))
+            break
+
+    out: list[str] = []
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            out.append(chunk)
+            continue
+
+        out.extend(chunk["head"])
+        key = _po_entry_key(chunk)
+        singular = translations.get(key)
+
+        if _po_is_header(chunk) or singular is None:
+            out.extend(chunk["msgstr_lines"])
+            continue
+
+        if chunk["msgid_plural"] is None:
+            out.extend(_po_msgstr_lines("msgstr", singular))
+            continue
+
+        plural = translations.get(key + PLURAL_SUFFIX, singular)
+        count = max(nplurals, len(chunk["msgstr"]))
+        for index in range(count):
+            out.extend(_po_msgstr_lines(f"msgstr[{index}]", singular if index == 0 else plural))
+
+    return "\n".join(out) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# XLIFF 1.2 / 2.0
+# ---------------------------------------------------------------------------
+
+
+def _xliff_parse(content: str) -> tuple[ET.Element, str]:
+    """Parse XLIFF keeping comments. Returns (root, namespace_prefix)."""
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    root = ET.fromstring(content, parser=parser)
+    ns = root.tag[: root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    return root, ns
+
+
+def _xliff_units(root: ET.Element, ns: str) -> list[tuple[str, ET.Element, ET.Element]]:
+    """Return (key, container, source) for every plain-text source in the document."""
+    units: list[tuple[str, ET.Element, ET.Element]] = []
+    is_v2 = root.get("version", "").startswith("2")
+
+    for file_el in root.iter(f"{ns}file"):
+        file_id = file_el.get("id" if is_v2 else "original", "")
+        if is_v2:
+            for unit in file_el.iter(f"{ns}unit"):
+                for index, segment in enumerate(unit.findall(f"{ns}segment")):
+                    source = segment.find(f"{ns}source")
+                    seg_id = segment.get("id") or str(index)
+                    key = CONTEXT_SEPARATOR.join((file_id, unit.get("id", ""), seg_id))
+                    units.append((key, segment, source))
+        else:
+            for unit in file_el.iter(f"{ns}trans-unit"):
+                if unit.get("translate") == "no":
+                    continue
+                source = unit.find(f"{ns}source")
+                key = CONTEXT_SEPARATOR.join((file_id, unit.get("id", "")))
+                units.append((key, unit, source))
+
+    # Sources with inline markup (<g>, <x/>, <ph>...) are left untouched
+    return [(key, container, source) for key, container, source in units
+            if source is not None and len(source) == 0 and (source.text or "").strip()]
+
+
+def _extract_xliff(content: str) -> list[Dict[str, str]]:
+    root, ns = _xliff_parse(content)
+    return [{"key": key, "source": source.text} for key, _, source in _xliff_units(root, ns)]
+
+
+def _apply_xliff(content: str, translations: Dict[str, str], target_language: str = "") -> str:
+    root, ns = _xliff_parse(content)
+
+    for key, container, source in _xliff_units(root, ns):
+        translated = translations.get(key)
+        if translated is None:
+            continue
+        target = container.find(f"{ns}target")
+        if target is None:
+            target = ET.Element(f"{ns}target")
+            container.insert(list(container).index(source) + 1, target)
+        target.text = translated
+        if not root.get("version", "").startswith("2"):
+            target.set("state", "translated")
+
+    if target_language:
+        if root.get("version", "").startswith("2"):
+            root.set("trgLang", target_language)
+        else:
+            for file_el in root.iter(f"{ns}file"):
+                file_el.set("target-language", target_language)
+
+    if ns:
+        ET.register_namespace("", ns[1:-1])
+    return ET.tostring(root, encoding="unicode", xml_declaration=True) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# SubRip (SRT) / WebVTT
+# ---------------------------------------------------------------------------
+
+VTT_PASSTHROUGH_BLOCKS = ("WEBVTT", "NOTE", "STYLE", "REGION")
+
+
+def _subtitle_blocks(content: str) -> list[list[str]]:
+    normalized = content.replace("\r\n", "\n").strip("\n")
+    return [block.split("\n") for block in re.split(r"\n\s*\n", normalized)]
+
+
+def _subtitle_cue(lines: list[str], file_format: str, number: int) -> tuple[str, int] | None:
+    """Return (cue key, index of the first text line) or None for non-cue blocks."""
+    if file_format == "vtt" and lines[0].startswith(VTT_PASSTHROUGH_BLOCKS):
+        return None
+    if "-->" in lines[0]:
+        return (f"cue-{number}", 1) if file_format == "vtt" else None
+    if len(lines) > 1 and "-->" in lines[1]:
+        return lines[0].strip(), 2
+    return None
+
+
+def _subtitle_segments(content: str, file_format: str) -> list[tuple[str, int, list[str]]]:
+    """Return (key, block index, text lines) for every cue."""
+    cues: list[tuple[str, int, list[str]]] = []
+    for block_index, lines in enumerate(_subtitle_blocks(content)):
+        cue = _subtitle_cue(lines, file_format, len(cues) + 1)
+        if cue and lines[cue[1]:]:
+            cues.append((cue[0], block_index, lines[cue[1]:]))
+    return cues
+
+
+def _extract_subtitles(content: str, file_format: str) -> list[Dict[str, str]]:
+    return [{"key": key, "source": "\n".join(text)}
+            for key, _, text in _subtitle_segments(content, file_format)]
+
+
+def _apply_subtitles(content: str, file_format: str, translations: Dict[str, str]) -> str:
+    blocks = _subtitle_blocks(content)
+    for key, block_index, text in _subtitle_segments(content, file_format):
+        translated = translations.get(key)
+        if translated is None:
+            continue
+        lines = blocks[block_index]
+        blocks[block_index] = lines[: len(lines) - len(text)] + translated.strip("\n").split("\n")
+    return "\n\n".join("\n".join(lines) for lines in blocks) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def extract_segments(content: str, file_format: str) -> list[Dict[str, str]]:
+    """Return the translatable segments of a file as [{'key', 'source'}]."""
+    if file_format == "po":
+        return _extract_po(content)
+    if file_format == "xliff":
+        return _extract_xliff(content)
+    return _extract_subtitles(content, file_format)
+
+
+def check_file(content: str, file_format: str) -> str | None:
+    """Return error if the file cannot be parsed, else None."""
+    try:
+        extract_segments(content, file_format)
+    except ET.ParseError as exc:
+        return f"Invalid {file_format.upper()} file: {exc}."
+    return None
+
+
+def apply_translations(
+    content: str,
+    file_format: str,
+    translations: Dict[str, str],
+    target_language: str = "",
+) -> str:
+    """
+    Write translations back into the original file.
+
+    Segments without a translation are left exactly as they appear in the source.
+    """
+    if file_format == "po":
+        return _apply_po(content, translations)
+    if file_format == "xliff":
+        return _apply_xliff(content, translations, target_language)
+    return _apply_subtitles(content, file_format, translations)
+
+
+def _key_context(key: str) -> tuple[str, bool]:
+    """
+    Return the part of a segment key that a reused translation must share:
+    the PO msgctxt or XLIFF file id, and whether the key is a plural form.
+    """
+    context = key.split(CONTEXT_SEPARATOR, 1)[0] if CONTEXT_SEPARATOR in key else ""
+    return context, key.endswith(PLURAL_SUFFIX)
+
+
+def diff_segments(
+    segments: list[Dict[str, str]],
+    previous: Dict[str, Dict[str, str]] | None,
+) -> tuple[Dict[str, str], list[Dict[str, str]]]:
+    """
+    Compare segments against the previously stored translation state.
+
+    Args:
+        segments: Output of extract_segments().
+        previous: Stored state, {key: {'source': str, 'target': str}}.
+
+    Returns:
+        (reused translations {key: target}, segments that still need translating)
+    """
+    previous = previous or {}
+    by_source = {(_key_context(key), item["source"]): item["target"] for key, item in previous.items()}
+
+    reused: Dict[str, str] = {}
+    pending: list[Dict[str, str]] = []
+    for segment in segments:
+        stored = previous.get(segment["key"])
+        if stored and stored.get("source") == segment["source"]:
+            reused[segment["key"]] = stored["target"]
+        elif (_key_context(segment["key"]), segment["source"]) in by_source:
+            # Moved or renumbered entry with the same source in the same context
+            reused[segment["key"]] = by_source[(_key_context(segment["key"]), segment["source"])]
+        else:
+            pending.append(segment)
+    return reused, pending
+
+
+def build_state(
+    segments: list[Dict[str, str]],
+    translations: Dict[str, str],
+) -> Dict[str, Dict[str, str]]:
+    """Build the state to store for the next run (translated segments only)."""
+    return {
+        segment["key"]: {"source": segment["source"], "target": translations[segment["key"]]}
+        for segment in segments
+        if segment["key"] in translations
+    }
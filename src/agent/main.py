@@ -6,19 +6,41 @@ Anthropic, Google Gemini) and outputs a stable JSON schema.
 """
 
 import asyncio
+import hashlib
 import logging
+import re
 import time
 from typing import Any, Dict
+from urllib.parse import urlparse
 
 from apify import Actor
 
+from .batch import translate_batch
+from .capabilities import (
+    check_language_pair,
+    check_model,
+    fetch_capabilities,
+    is_fresh,
+    snapshot_capabilities,
+)
+from .concurrency import configure_limiters, get_limiter
+from .keys import KeyPool
+from .localization import apply_translations, build_state, check_file, diff_segments, extract_segments
+from .memory import TranslationMemory
+from .scheduler import run_scheduled
 from .translator import translate_text
 from .validation import (
     validate_api_key,
+    validate_concurrency,
+    validate_deadline,
     validate_endpoint,
+    validate_fuzzy_threshold,
+    validate_items,
     validate_language_code,
+    validate_localization_file,
     validate_model,
     validate_provider,
+    validate_requests_per_minute,
     validate_text,
     sanitize_text,
     DEFAULT_MODELS,
@@ -26,27 +48,344 @@ from .validation import (
 
 logger = logging.getLogger(__name__)
 
+# Named key-value stores that persist between runs
+LOCALIZATION_STORE = "localization-state"
+TRANSLATION_MEMORY_STORE = "translation-memory"
+CAPABILITIES_STORE = "provider-capabilities"
+
+# Default key-value store record with the scheduling metrics of a multi-item run
+RUN_METRICS_KEY = "RUN_METRICS"
+
+
+def _store_key(key: str) -> str:
+    """Make a string safe to use as a key-value store key."""
+    return re.sub(r"[^a-zA-Z0-9!_.'()-]", "-", key)[:200]
+
+
+def _memory_key(source_language: str, target_language: str) -> str:
+    return _store_key(f"tm-{source_language}-{target_language}")
+
+
+async def _load_capabilities(provider: str, api_key: str | None, endpoint: str | None) -> Dict[str, Any]:
+    """
+    Return provider capabilities, cached in CAPABILITIES_STORE with a TTL.
+
+    Model lists depend on the API key's permissions, so the cache is keyed by a
+    hash of the key as well as the endpoint host.
+
+    Falls back to a stale cache entry, then to the built-in snapshot, when
+    discovery is unavailable.
+    """
+    store = await Actor.open_key_value_store(name=CAPABILITIES_STORE)
+    host = urlparse(endpoint).hostname if endpoint else "default"
+    key_hash = hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else "nokey"
+    key = _store_key(f"caps-{provider}-{host}-{key_hash}")
+
+    cached = await store.get_value(key)
+    if is_fresh(cached):
+        return cached
+
+    discovered = await asyncio.to_thread(fetch_capabilities, provider, api_key, endpoint)
+    if discovered:
+        await store.set_value(key, discovered)
+        return discovered
+
+    if cached:
+        logger.warning("Capability discovery unavailable for %s - using stale cached capabilities", provider)
+        return cached
+    logger.warning("Capability discovery unavailable for %s - using built-in snapshot", provider)
+    return snapshot_capabilities(provider, endpoint)
+
+
+async def _prefetch_translation_memory(
+    memory: TranslationMemory,
+    source_language: str,
+    target_language: str,
+    texts: list[str],
+) -> None:
+    """Load the translation memory shards needed to look up and add `texts`."""
+    store = await Actor.open_key_value_store(name=TRANSLATION_MEMORY_STORE)
+    prefix = _memory_key(source_language, target_language)
+    while names := memory.missing_shards(texts):
+        records = await asyncio.gather(*(store.get_value(f"{prefix}-{name}") for name in names))
+        for name, record in zip(names, records):
+            memory.load_shard(name, record)
+    logger.info("Translation memory: %d candidate segments loaded", len(memory))
+
+
+async def _save_translation_memory(memory: TranslationMemory, source_language: str, target_language: str) -> None:
+    """Write back only the shards changed in this run."""
+    changed = memory.changed_shards()
+    if not changed:
+        return
+    store = await Actor.open_key_value_store(name=TRANSLATION_MEMORY_STORE)
+    prefix = _memory_key(source_language, target_language)
+    await asyncio.gather(*(store.set_value(f"{prefix}-{name}", record) for name, record in changed.items()))
+
+
+async def _translate_localization_file(
+    content: str,
+    file_format: str,
+    state_key: str,
+    translate_kwargs: Dict[str, Any],
+    memory: TranslationMemory | None = None,
+    fuzzy_threshold: float = 0.8,
+    post_edit: bool = True,
+) -> Dict[str, Any]:
+    """
+    Translate only the new or changed segments of a localization file.
+
+    The previous translation state is read from (and written back to) the
+    LOCALIZATION_STORE key-value store under `state_key`. With a translation
+    memory, segments that differ from a stored one only in numbers are filled in
+    directly and other fuzzy matches are sent as post-edit requests.
+    """
+    store = await Actor.open_key_value_store(name=LOCALIZATION_STORE)
+    previous = await store.get_value(state_key) or {}
+    if previous and (
+        previous.get("format") != file_format
+        or previous.get("target_language") != translate_kwargs["target_language"]
+    ):
+        # Translations stored for another language or format must not be reused
+        logger.warning(
+            "Stored state '%s' is for %s/%s, not %s/%s - translating all segments",
+            state_key, previous.get("format"), previous.get("target_language"),
+            file_format, translate_kwargs["target_language"],
+        )
+        previous = {}
+
+    segments = extract_segments(content, file_format)
+    translations, pending = diff_segments(segments, previous.get("segments"))
+    reused_count = len(translations)
+
+    errors: list[str] = []
+    to_translate: list[Dict[str, str]] = []
+    for segment in pending:
+        segment_err = validate_text(
+            segment["source"],
+            provider=translate_kwargs["provider"],
+            endpoint=translate_kwargs.get("endpoint"),
+        )
+        if segment_err:
+            errors.append(f"{segment['key']!r}: {segment_err}")
+        else:
+            to_translate.append(segment)
+
+    fuzzy_count = 0
+    references: list[Dict[str, Any] | None] = []
+    if memory is not None:
+        await _prefetch_translation_memory(
+            memory, translate_kwargs["source_language"], translate_kwargs["target_language"],
+            [segment["source"] for segment in segments],
+        )
+        for segment in segments:
+            if segment["key"] in translations:
+                memory.add(segment["source"], translations[segment["key"]])
+
+        remaining: list[Dict[str, str]] = []
+        for segment in to_translate:
+            match = memory.lookup(segment["source"], fuzzy_threshold)
+            if match and match["translation"]:
+                translations[segment["key"]] = match["translation"]
+                fuzzy_count += 1
+                continue
+            remaining.append(segment)
+            references.append(match if post_edit else None)
+        to_translate = remaining
+
+    logger.info(
+        "Localization file: %d segments, %d reused, %d from translation memory, %d to translate",
+        len(segments), reused_count, fuzzy_count, len(to_translate),
+    )
+
+    results = await translate_batch(
+        [segment["source"] for segment in to_translate],
+        references=references or None,
+        **translate_kwargs,
+    )
+    limiter = get_limiter(translate_kwargs["provider"], translate_kwargs["model"], translate_kwargs["endpoint"])
+
+    translated_count = 0
+    character_count = 0
+    billing_amount = 0.0
+    model_used = ""
+    for segment, result in zip(to_translate, results):
+        if result.get("error"):
+            errors.append(f"{segment['key']!r}: {result['error']}")
+            continue
+        translations[segment["key"]] = result["translated_text"]
+        translated_count += 1
+        if memory is not None:
+            memory.add(segment["source"], result["translated_text"])
+        character_count += result.get("character_count", 0)
+        billing_amount += result.get("billing_amount", 0.0)
+        model_used = result.get("model_used", model_used)
+
+    await store.set_value(state_key, {
+        "format": file_format,
+        "target_language": translate_kwargs["target_language"],
+        "segments": build_state(segments, translations),
+    })
+
+    translated_file = apply_translations(
+        content, file_format, translations, target_language=translate_kwargs["target_language"],
+    )
+    await Actor.set_value(f"{state_key}.{file_format}", translated_file, content_type="text/plain")
+
+    return {
+        "model": model_used,
+        "segment_count": len(segments),
+        "translated_count": translated_count,
+        "reused_count": reused_count,
+        "fuzzy_match_count": fuzzy_count,
+        "failed_count": len(errors),
+        "character_count": character_count,
+        "billing_amount": round(billing_amount, 6),
+        "translated_file": translated_file,
+        "errors": errors,
+        "concurrency": limiter.snapshot(),
+        "api_keys": translate_kwargs["key_pool"].snapshot(),
+    }
+
+
+def _build_output(
+    provider: str,
+    source_language: str,
+    target_language: str,
+    text: str,
+    result: Dict[str, Any],
+    processing_time: float,
+    fuzzy_match_score: float = 0.0,
+) -> Dict[str, Any]:
+    """Build the stable output item -- no missing keys."""
+    return {
+        "schema_version": "1.0",
+        "provider": provider,
+        "model": result.get("model_used", ""),
+        "source_language": source_language,
+        "target_language": target_language,
+        "detected_language": result.get("detected_language", ""),
+        "original_text": text,
+        "translated_text": result.get("translated_text", ""),
+        "character_count": result.get("character_count", 0),
+        "billing_amount": result.get("billing_amount", 0.0),
+        "finish_reason": result.get("finish_reason", ""),
+        "fuzzy_match_score": fuzzy_match_score,
+        "processing_time": processing_time,
+    }
+
+
+async def _translate_items(
+    items: list[Dict[str, Any]],
+    translate_kwargs: Dict[str, Any],
+    capabilities: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Translate a multi-item input with priority and size-aware scheduling.
+
+    Items may override source_language/target_language; items with invalid text
+    or an unsupported language pair are rejected up front. Each item is pushed
+    to the dataset as soon as it completes, with item_id, priority and error
+    added to the stable output.
+    """
+    provider = translate_kwargs["provider"]
+
+    async def push(item: Dict[str, Any], result: Dict[str, Any], latency: float) -> None:
+        output = _build_output(
+            provider, item["source_language"], item["target_language"], item["text"], result, round(latency, 3),
+        )
+        output.update(item_id=item["item_id"], priority=item["priority"], error=result.get("error", ""))
+        await Actor.push_data(output)
+
+    scheduled: list[Dict[str, Any]] = []
+    rejected = 0
+    for position, raw in enumerate(items, start=1):
+        source_language = (raw.get("source_language") or translate_kwargs["source_language"]).lower().strip()
+        target_language = (raw.get("target_language") or translate_kwargs["target_language"]).lower().strip()
+        item = {
+            "item_id": str(raw.get("id", position)),
+            "priority": raw.get("priority", "normal"),
+            "text": sanitize_text(raw["text"]),
+            "source_language": source_language,
+            "target_language": target_language,
+        }
+        # Long items are chunked by the scheduler, so only the overall limit applies
+        item_err = validate_text(item["text"])
+        if not item_err and not validate_language_code(target_language):
+            item_err = f"Invalid target language code '{target_language}'."
+        if not item_err and source_language != "auto" and not validate_language_code(source_language):
+            item_err = f"Invalid source language code '{source_language}'."
+        item_err = item_err or check_language_pair(capabilities, source_language, target_language)
+        if item_err:
+            rejected += 1
+            await push(item, {"error": item_err}, 0.0)
+            continue
+        scheduled.append(item)
+
+    def translate(item: Dict[str, Any], text: str) -> Dict[str, Any]:
+        return translate_text(
+            text=text,
+            **{
+                **translate_kwargs,
+                "source_language": item["source_language"],
+                "target_language": item["target_language"],
+            },
+        )
+
+    limiter = get_limiter(provider, translate_kwargs["model"], translate_kwargs["endpoint"])
+    latency = await run_scheduled(
+        scheduled,
+        translate,
+        capacity=lambda: limiter.snapshot()["limit"],
+        on_result=push,
+        deadline=translate_kwargs.get("deadline"),
+        size_by="characters" if provider == "libretranslate" else "tokens",
+    )
+
+    return {
+        "item_count": len(items),
+        "rejected_count": rejected,
+        "failed_count": sum(stats["failed"] for stats in latency.values()),
+        "latency_by_priority": latency,
+        "concurrency": limiter.snapshot(),
+        "api_keys": translate_kwargs["key_pool"].snapshot(),
+    }
+
 
 async def main() -> None:
     async with Actor:
         actor_input: Dict[str, Any] = await Actor.get_input() or {}
+        run_started = time.monotonic()
 
         # -----------------------------------------------------------------
         # Parse inputs
         # -----------------------------------------------------------------
         test_mode = actor_input.get("testMode", True)
         text_raw = actor_input.get("text", "")
+        items = actor_input.get("items")
         target_language = actor_input.get("target_language", "es").lower().strip()
         source_language_raw = actor_input.get("source_language")
         source_language = source_language_raw.lower().strip() if source_language_raw else "auto"
 
         provider = actor_input.get("provider", "libretranslate").lower().strip()
         api_key = actor_input.get("api_key")
+        api_keys = actor_input.get("api_keys")
+        key_requests_per_minute = actor_input.get("keyRequestsPerMinute")
         model = actor_input.get("model")
         endpoint = actor_input.get("endpoint")
         temperature = actor_input.get("temperature", 0)
         max_retries = actor_input.get("maxRetries", 3)
         timeout_secs = actor_input.get("timeoutSecs", 30)
+        deadline_secs = actor_input.get("deadlineSecs")
+        concurrency = actor_input.get("concurrency", 4)
+        adaptive_concurrency = actor_input.get("adaptiveConcurrency", True)
+        use_memory = actor_input.get("translationMemory", False)
+        fuzzy_threshold = actor_input.get("fuzzyThreshold", 0.8)
+        post_edit = actor_input.get("postEditFuzzyMatches", True)
+
+        localization_file = actor_input.get("localization_file")
+        localization_format = (actor_input.get("localization_format") or "").lower().strip()
+        localization_key = actor_input.get("localization_key")
 
         # -----------------------------------------------------------------
         # Test mode -- return mock response for Apify automated QA
@@ -69,6 +408,7 @@ async def main() -> None:
                 "character_count": 0,
                 "billing_amount": 0.0,
                 "finish_reason": "test-mode",
+                "fuzzy_match_score": 0.0,
                 "processing_time": 0.0,
             }
             await Actor.push_data(mock_output)
@@ -84,9 +424,18 @@ async def main() -> None:
             await Actor.fail(status_message=provider_err)
             return
 
-        # Text
-        text = sanitize_text(text_raw)
-        text_err = validate_text(text, provider=provider, endpoint=endpoint)
+        # Text or localization file
+        if localization_file:
+            localization_file = sanitize_text(localization_file)
+            text_err = (
+                validate_localization_file(localization_file, localization_format)
+                or check_file(localization_file, localization_format)
+            )
+        elif items:
+            text_err = validate_items(items)
+        else:
+            text = sanitize_text(text_raw)
+            text_err = validate_text(text, provider=provider, endpoint=endpoint)
         if text_err:
             await Actor.fail(status_message=text_err)
             return
@@ -106,12 +455,16 @@ async def main() -> None:
             )
             return
 
-        # API key
-        key_err = validate_api_key(provider, api_key)
+        # API key(s)
+        key_err = validate_api_key(provider, api_key, api_keys) or validate_requests_per_minute(key_requests_per_minute)
         if key_err:
             await Actor.fail(status_message=key_err)
             return
 
+        pooled_keys = [key.strip() for key in [api_key, *(api_keys or [])] if key and key.strip()]
+        api_key = pooled_keys[0]
+        key_pool = KeyPool(pooled_keys, key_requests_per_minute)
+
         # Model
         resolved_model, model_err = validate_model(provider, model)
         if model_err:
@@ -124,6 +477,114 @@ async def main() -> None:
             await Actor.fail(status_message=endpoint_err)
             return
 
+        # Concurrency
+        concurrency_err = validate_concurrency(concurrency)
+        if concurrency_err:
+            await Actor.fail(status_message=concurrency_err)
+            return
+
+        # Deadline
+        deadline_err = validate_deadline(deadline_secs)
+        if deadline_err:
+            await Actor.fail(status_message=deadline_err)
+            return
+
+        # Translation memory
+        if use_memory:
+            threshold_err = validate_fuzzy_threshold(fuzzy_threshold)
+            if threshold_err:
+                await Actor.fail(status_message=threshold_err)
+                return
+
+        # Provider capabilities -- reject unsupported models / language pairs
+        # once all local input checks have passed, as discovery
+        # sends the API key to the provider
+        capabilities = await _load_capabilities(provider, api_key, endpoint)
+        capability_err = (
+            check_model(capabilities, provider, resolved_model)
+            # Multi-item runs check each item's language pair separately
+            or (None if items else check_language_pair(capabilities, source_language, target_language))
+        )
+        if capability_err:
+            await Actor.fail(status_message=capability_err)
+            return
+
+        configure_limiters(initial=concurrency, adaptive=adaptive_concurrency)
+
+        translate_kwargs: Dict[str, Any] = {
+            "source_language": source_language,
+            "target_language": target_language,
+            "provider": provider,
+            "api_key": api_key,
+            "model": resolved_model,
+            "endpoint": endpoint,
+            "temperature": temperature,
+            "timeout": timeout_secs,
+            "max_retries": max_retries,
+            "deadline": run_started + deadline_secs if deadline_secs else None,
+            "key_pool": key_pool,
+        }
+
+        # Translation memory is per language pair, so it is not used for multi-item runs
+        use_memory = use_memory and not items
+        memory = TranslationMemory(persisted=True) if use_memory else None
+
+        # -----------------------------------------------------------------
+        # Localization file -- translate new/changed segments only
+        # -----------------------------------------------------------------
+        if localization_file:
+            state_key = _store_key(
+                localization_key or f"l10n-{localization_format}-{source_language}-{target_language}"
+            )
+
+            start_time = time.time()
+            summary = await _translate_localization_file(
+                localization_file, localization_format, state_key, translate_kwargs,
+                memory=memory, fuzzy_threshold=fuzzy_threshold, post_edit=post_edit,
+            )
+            processing_time = round(time.time() - start_time, 3)
+
+            if memory is not None:
+                await _save_translation_memory(memory, source_language, target_language)
+
+            await Actor.push_data({
+                "schema_version": "1.0",
+                "provider": provider,
+                "source_language": source_language,
+                "target_language": target_language,
+                "localization_format": localization_format,
+                "localization_key": state_key,
+                **summary,
+                "processing_time": processing_time,
+            })
+            logger.info(
+                "Localization file complete in %.3fs (%d translated, %d reused, %d failed, concurrency limit %d)",
+                processing_time, summary["translated_count"], summary["reused_count"], summary["failed_count"],
+                summary["concurrency"]["limit"],
+            )
+            return
+
+        # -----------------------------------------------------------------
+        # Multiple items -- priority and size-aware scheduling
+        # -----------------------------------------------------------------
+        if items:
+            logger.info("Scheduling %d items with provider=%s model=%s", len(items), provider, resolved_model or "(n/a)")
+            start_time = time.time()
+            metrics = await _translate_items(items, translate_kwargs, capabilities)
+            metrics["processing_time"] = round(time.time() - start_time, 3)
+            await Actor.set_value(RUN_METRICS_KEY, metrics)
+            for priority, stats in metrics["latency_by_priority"].items():
+                logger.info(
+                    "%s: %d items, p50 %.3fs, p95 %.3fs, first result %.3fs",
+                    priority, stats["items"], stats["latency_p50_secs"], stats["latency_p95_secs"],
+                    stats["first_result_secs"],
+                )
+            logger.info(
+                "Items complete in %.3fs (%d rejected, %d failed)",
+                metrics["processing_time"], metrics["rejected_count"], metrics["failed_count"],
+            )
+            return
+
         # -----------------------------------------------------------------
         # Translate
         # -----------------------------------------------------------------
@@ -133,18 +594,23 @@ async def main() -> None:
         )
 
         start_time = time.time()
-        result = translate_text(
-            text=text,
-            source_language=source_language,
-            target_language=target_language,
-            provider=provider,
-            api_key=api_key,
-            model=resolved_model,
-            endpoint=endpoint,
-            temperature=temperature,
-            timeout=timeout_secs,
-            max_retries=max_retries,
-        )
+        if memory is not None:
+            await _prefetch_translation_memory(memory, source_language, target_language, [text])
+        match = memory.lookup(text, fuzzy_threshold) if memory is not None else None
+        if match and match["translation"]:
+            logger.info("Translation memory hit (score %.2f) - no provider call needed", match["score"])
+            result = {
+                "translated_text": match["translation"],
+                "detected_language": "",
+                "character_count": 0,
+                "billing_amount": 0.0,
+                "finish_reason": "translation-memory",
+                "model_used": "",
+            }
+        else:
+            result = translate_text(
+                text=text, reference=match if post_edit else None, **translate_kwargs,
+            )
         processing_time = round(time.time() - start_time, 3)
 
         # -----------------------------------------------------------------
@@ -157,22 +623,15 @@ async def main() -> None:
         # -----------------------------------------------------------------
         # Push stable output -- no missing keys
         # -----------------------------------------------------------------
-        output = {
-            "schema_version": "1.0",
-            "provider": provider,
-            "model": result.get("model_used", ""),
-            "source_language": source_language,
-            "target_language": target_language,
-            "detected_language": result.get("detected_language", ""),
-            "original_text": text,
-            "translated_text": result.get("translated_text", ""),
-            "character_count": result.get("character_count", 0),
-            "billing_amount": result.get("billing_amount", 0.0),
-            "finish_reason": result.get("finish_reason", ""),
-            "processing_time": processing_time,
-        }
+        output = _build_output(
+            provider, source_language, target_language, text, result, processing_time,
+            fuzzy_match_score=match["score"] if match else 0.0,
+        )
 
         await Actor.push_data(output)
+        if memory is not None and not (match and match["translation"]):
+            memory.add(text, output["translated_text"])
+            await _save_translation_memory(memory, source_language, target_language)
         logger.info("Translation complete in %.3fs", processing_time)
 
 
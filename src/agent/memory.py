@@ -0,0 +1,252 @@
+"""
+Fuzzy translation memory.
+
+Indexes previously translated segments with MinHash signatures over character
+trigrams and LSH banding, so near-duplicate source strings (a word, a number or
+punctuation apart) are found without scanning the whole memory. Candidates are
+ranked by band collisions and the best few are scored with an edit-based
+similarity ratio.
+
+A persisted memory is split into SHARD_COUNT index shards (LSH buckets) and
+SHARD_COUNT entry shards (the translation pairs), so a run loads only the
+shards its texts can match and writes back only the shards it changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+import zlib
+from difflib import SequenceMatcher
+from typing import Any, Dict
+
+NUM_PERM = 32           # MinHash signature length
+BANDS = 8               # LSH bands (NUM_PERM / BANDS rows each, ~0.6 Jaccard threshold)
+SHINGLE_SIZE = 3        # character n-gram length
+MAX_CANDIDATES = 8      # candidates scored with SequenceMatcher per lookup
+MAX_BUCKET_SIZE = 256   # stop growing very common buckets (boilerplate strings)
+SHARD_COUNT = 256       # index shards and entry shards of a persisted memory
+
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_EMPTY = (1 << 64) - 1
+# Mixing masks for densified bins (keyed by borrowing distance)
+_MASKS = [random.Random(1337 + i).getrandbits(58) for i in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE_PATTERN.sub(" ", text.strip().lower())
+
+
+def _signature(text: str) -> list[int]:
+    """
+    MinHash signature of the text's character trigrams.
+
+    Uses one-permutation hashing: each trigram hash falls into one of NUM_PERM
+    bins and the bin keeps its minimum, so the cost is one pass over the
+    trigrams instead of one per permutation. Empty bins borrow the next
+    non-empty bin's value (rotation densification). Trigrams are hashed with
+    CRC-32 rather than hash(), which is salted per process, so persisted
+    bucket keys stay valid between runs.
+    """
+    padded = f" {text} "
+    signature = [_EMPTY] * NUM_PERM
+    for i in range(max(1, len(padded) - SHINGLE_SIZE + 1)):
+        h = zlib.crc32(padded[i:i + SHINGLE_SIZE].encode())
+        slot, value = h % NUM_PERM, h // NUM_PERM
+        if value < signature[slot]:
+            signature[slot] = value
+
+    for slot in range(NUM_PERM):
+        if signature[slot] == _EMPTY:
+            for offset in range(1, NUM_PERM):
+                donor = signature[(slot + offset) % NUM_PERM]
+                if donor != _EMPTY:
+                    signature[slot] = donor ^ _MASKS[offset]
+                    break
+    return signature
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=6).hexdigest()
+
+
+def _entry_id(source: str) -> str:
+    """Id of a translation pair; 128 bits, so distinct sources do not collide."""
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+def _bands(signature: list[int]) -> list[str]:
+    """LSH bucket keys, one per band (hex strings; the first byte picks the index shard)."""
+    return [_digest(f"{band}:{signature[band * _ROWS:(band + 1) * _ROWS]}") for band in range(BANDS)]
+
+
+def _shard(prefix: str, key: str) -> str:
+    return f"{prefix}{key[:2]}"
+
+
+def _transfer_numbers(text: str, source: str, target: str) -> str | None:
+    """
+    Reuse a translation when the texts differ only in numbers.
+
+    Returns the stored translation with the old numbers replaced by the new
+    ones, or None if the texts differ otherwise or a number is ambiguous.
+    """
+    new_numbers = NUMBER_PATTERN.findall(text)
+    old_numbers = NUMBER_PATTERN.findall(source)
+    if len(new_numbers) != len(old_numbers) or NUMBER_PATTERN.sub("#", text) != NUMBER_PATTERN.sub("#", source):
+        return None
+
+    replacements = {old: new for old, new in zip(old_numbers, new_numbers) if old != new}
+    for old in replacements:
+        if old_numbers.count(old) != 1 or NUMBER_PATTERN.findall(target).count(old) != 1:
+            return None
+
+    return NUMBER_PATTERN.sub(lambda m: replacements.get(m.group(0), m.group(0)), target)
+
+
+class TranslationMemory:
+    """
+    Fuzzy index of (source, target) translation pairs.
+
+    A standalone memory keeps everything in RAM. A persisted memory starts
+    empty: load the shards reported by missing_shards() with load_shard() before
+    looking up or adding texts, and store the records from changed_shards()
+    afterwards. Shard names are 'i<xx>' for index shards and 'e<xx>' for entry shards.
+    """
+
+    def __init__(self, persisted: bool = False) -> None:
+        self._entries: dict[str, list[str]] = {}   # entry id -> [source, target]
+        self._buckets: dict[str, list[str]] = {}   # LSH bucket key -> entry ids
+        self._persisted = persisted
+        self._loaded: set[str] = set()
+        self._dirty: set[str] = set()
+
+    def __len__(self) -> int:
+        """Number of loaded translation pairs."""
+        return len(self._entries)
+
+    def missing_shards(self, texts: list[str]) -> list[str]:
+        """
+        Return the shards not yet loaded that are needed to look up or add `texts`.
+
+        Index shards are reported first, since they decide which entry shards
+        hold candidates; call again after loading them until nothing is missing.
+        """
+        if not self._persisted:
+            return []
+        bands = {text: _bands(_signature(_normalize(text))) for text in texts}
+        index = {_shard("i", band) for keys in bands.values() for band in keys} - self._loaded
+        if index:
+            return sorted(index)
+
+        entries = set()
+        for text, keys in bands.items():
+            entries.add(_shard("e", _entry_id(text)))
+            for band in keys:
+                entries.update(_shard("e", entry_id) for entry_id in self._buckets.get(band, ()))
+        return sorted(entries - self._loaded)
+
+    def load_shard(self, name: str, data: Dict[str, Any] | None) -> None:
+        """Load a stored shard record (None if the shard was never written)."""
+        if name in self._loaded:
+            return
+        self._loaded.add(name)
+        if data:
+            (self._buckets if name.startswith("i") else self._entries).update(data)
+
+    def changed_shards(self) -> Dict[str, Dict[str, Any]]:
+        """Return {shard name: record} for every shard changed since loading, and mark them clean."""
+        changed: Dict[str, Dict[str, Any]] = {name: {} for name in self._dirty}
+        for prefix, items in (("i", self._buckets), ("e", self._entries)):
+            for key, value in items.items():
+                record = changed.get(_shard(prefix, key))
+                if record is not None:
+                    record[key] = value
+        self._dirty.clear()
+        return changed
+
+    def _require(self, names: list[str]) -> None:
+        missing = [name for name in names if self._persisted and name not in self._loaded]
+        if missing:
+            raise RuntimeError(f"Translation memory shards not loaded: {', '.join(missing)}")
+
+    def add(self, source: str, target: str) -> None:
+        """Add or update a translation pair."""
+        entry_id = _entry_id(source)
+        bands = _bands(_signature(_normalize(source)))
+        self._require([_shard("e", entry_id), *(_shard("i", band) for band in bands)])
+
+        entry = self._entries.get(entry_id)
+        if entry == [source, target]:
+            return
+        self._entries[entry_id] = [source, target]
+        self._dirty.add(_shard("e", entry_id))
+        if entry is not None:
+            return
+
+        for band in bands:
+            bucket = self._buckets.setdefault(band, [])
+            if len(bucket) < MAX_BUCKET_SIZE:
+                bucket.append(entry_id)
+                self._dirty.add(_shard("i", band))
+
+    def lookup(self, text: str, threshold: float = 0.8) -> Dict[str, Any] | None:
+        """
+        Find the most similar stored segment.
+
+        Args:
+            text: Source text to match.
+            threshold: Minimum similarity (0-1) to report a match.
+
+        Returns:
+            dict | None: {
+                'source': str,        # matched stored source
+                'target': str,        # its stored translation
+                'score': float,       # similarity, 1.0 for an exact match
+                'translation': str,   # ready-to-use translation, or '' if it needs post-editing
+            }
+        """
+        entry = self._entries.get(_entry_id(text))
+        if entry is not None and entry[0] == text:
+            return self._match(entry, 1.0, entry[1])
+
+        normalized = _normalize(text)
+        if not normalized:
+            return None
+
+        collisions: dict[str, int] = {}
+        for band in _bands(_signature(normalized)):
+            for candidate in self._buckets.get(band, ()):
+                collisions[candidate] = collisions.get(candidate, 0) + 1
+        if not collisions:
+            return None
+
+        best, best_score = None, 0.0
+        for candidate in sorted(collisions, key=collisions.get, reverse=True)[:MAX_CANDIDATES]:
+            entry = self._entries.get(candidate)
+            if entry is None:
+                continue
+            matcher = SequenceMatcher(None, normalized, _normalize(entry[0]), autojunk=False)
+            if matcher.real_quick_ratio() < max(threshold, best_score) or matcher.quick_ratio() < max(threshold, best_score):
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best, best_score = entry, score
+
+        if best is None or best_score < threshold:
+            return None
+
+        transferred = _transfer_numbers(text, best[0], best[1])
+        return self._match(best, round(best_score, 4), transferred or "")
+
+    def _match(self, entry: list[str], score: float, translation: str) -> Dict[str, Any]:
+        return {
+            "source": entry[0],
+            "target": entry[1],
+            "score": score,
+            "translation": translation,
+        }
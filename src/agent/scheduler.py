@@ -0,0 +1,241 @@
+"""
+Priority and size-aware scheduling for multi-item runs.
+
+Items are split into chunks of at most CHUNK_CHARS on sentence and paragraph
+boundaries, so a long document is translated as a series of short requests
+that interleave with short items instead of holding a worker slot for its
+whole duration. Chunks are dispatched by:
+
+1. Priority class -- interactive before normal before bulk. A waiting chunk is
+   promoted one class every CLASS_AGING_SECS, so bulk work is never starved.
+2. Fair queuing within a class -- each chunk's tag is its item's cumulative
+   size up to and including that chunk, so short items go first (shortest job
+   first) and long documents advance one chunk at a time alongside items of
+   similar size.
+
+Dispatch is paced by the provider's adaptive limiter: a chunk is only taken off
+the queue when a slot is free, so the queue -- not thread start order --
+decides what is sent next.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict
+
+from .batch import CANCELLED_RESULT
+from .translator import MIN_ATTEMPT_SECS
+from .validation import MAX_CONCURRENCY, PRIORITY_CLASSES
+
+logger = logging.getLogger(__name__)
+
+CHUNK_CHARS = 1_500          # below the libretranslate.com per-request limit
+CLASS_AGING_SECS = 30.0      # waiting time that promotes a chunk by one class
+DISPATCH_POLL_SECS = 0.05    # how often a full dispatcher re-checks the limiter
+
+# Sentence-ish units, each carrying its trailing whitespace
+_UNIT_PATTERN = re.compile(r".+?(?:(?<=[.!?。！？])\s+|\n\s*\n\s*|\Z)", re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough provider token count: ~4 ASCII characters per token, one token per
+    other character (CJK, accented letters, symbols).
+    """
+    ascii_chars = sum(1 for char in text if char < "\x80")
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def split_text(text: str, max_chars: int = CHUNK_CHARS) -> list[str]:
+    """
+    Split text into chunks of at most `max_chars`, preferring paragraph and
+    sentence boundaries, then spaces. Joining the chunks gives back the text.
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces: list[str] = []
+    for unit in _UNIT_PATTERN.findall(text):
+        while len(unit) > max_chars:
+            cut = unit.rfind(" ", 1, max_chars) + 1 or max_chars
+            pieces.append(unit[:cut])
+            unit = unit[cut:]
+        if unit:
+            pieces.append(unit)
+
+    chunks = [""]
+    for piece in pieces:
+        if chunks[-1] and len(chunks[-1]) + len(piece) > max_chars:
+            chunks.append("")
+        chunks[-1] += piece
+    return chunks
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linearly interpolated percentile (0-100) of `values`; 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class ChunkQueue:
+    """Per-class fair queues of chunks with time-based class promotion."""
+
+    def __init__(self) -> None:
+        self._heaps: dict[str, list[tuple[float, int, Dict[str, Any]]]] = {name: [] for name in PRIORITY_CLASSES}
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, chunk: Dict[str, Any], priority: str, tag: float) -> None:
+        chunk["enqueued_at"] = time.monotonic()
+        heapq.heappush(self._heaps[priority], (tag, next(self._seq), chunk))
+        self._size += 1
+
+    def pop(self) -> Dict[str, Any]:
+        """Remove and return the next chunk to dispatch."""
+        now = time.monotonic()
+        best_key, best_heap = None, None
+        for rank, name in enumerate(PRIORITY_CLASSES):
+            heap = self._heaps[name]
+            if not heap:
+                continue
+            tag, seq, chunk = heap[0]
+            promoted = max(0, rank - int((now - chunk["enqueued_at"]) // CLASS_AGING_SECS))
+            key = (promoted, tag, rank, seq)
+            if best_key is None or key < best_key:
+                best_key, best_heap = key, heap
+        self._size -= 1
+        return heapq.heappop(best_heap)[2]
+
+
+def _combine(parts: list[tuple[Dict[str, Any], str]]) -> Dict[str, Any]:
+    """Merge chunk results (result, trailing whitespace) back into one item result."""
+    for result, _ in parts:
+        if result.get("error"):
+            return {"error": result["error"]}
+    results = [result for result, _ in parts]
+    return {
+        "translated_text": "".join(result["translated_text"].strip() + trailing for result, trailing in parts).strip(),
+        "detected_language": next((r["detected_language"] for r in results if r.get("detected_language")), ""),
+        "character_count": sum(r.get("character_count", 0) for r in results),
+        "billing_amount": round(sum(r.get("billing_amount", 0.0) for r in results), 6),
+        "finish_reason": results[-1].get("finish_reason", ""),
+        "model_used": results[0].get("model_used", ""),
+    }
+
+
+async def run_scheduled(
+    items: list[Dict[str, Any]],
+    translate: Callable[[Dict[str, Any], str], Dict[str, Any]],
+    capacity: Callable[[], int],
+    on_result: Callable[[Dict[str, Any], Dict[str, Any], float], Awaitable[None]] | None = None,
+    deadline: float | None = None,
+    size_by: str = "tokens",
+    max_workers: int = MAX_CONCURRENCY,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Translate items in priority and size order.
+
+    Args:
+        items: Dicts with 'text' and optional 'priority' (default 'normal');
+            other keys are passed through to `translate` and `on_result`.
+        translate: Blocking call translating one chunk: translate(item, text) -> result dict.
+        capacity: Current number of requests that may be in flight (the limiter's limit).
+        on_result: Awaited as on_result(item, result, latency) when an item completes.
+        deadline: time.monotonic() timestamp after which no new chunk is started;
+            items with unstarted chunks fail with a cancellation error.
+        size_by: 'tokens' (estimated) or 'characters' for shortest-job-first ordering.
+        max_workers: Upper bound on concurrent chunks.
+
+    Returns:
+        dict: Per-priority-class stats {items, failed, chunks, first_result_secs,
+        latency_p50_secs, latency_p95_secs, latency_max_secs}; latencies are
+        measured from the start of the run to each item's completion.
+    """
+    started = time.monotonic()
+    queue = ChunkQueue()
+    latencies: dict[str, list[float]] = {}
+    stats: dict[str, Dict[str, Any]] = {}
+
+    for item in items:
+        priority = item.get("priority", "normal")
+        chunks = split_text(item["text"])
+        state = {"item": item, "priority": priority, "parts": [None] * len(chunks), "remaining": len(chunks)}
+        stats.setdefault(priority, {"items": 0, "failed": 0, "chunks": 0})
+        stats[priority]["items"] += 1
+        stats[priority]["chunks"] += len(chunks)
+        tag = 0
+        for index, text in enumerate(chunks):
+            tag += estimate_tokens(text) if size_by == "tokens" else len(text)
+            queue.push({"state": state, "index": index, "text": text}, priority, tag)
+
+    async def finish(chunk: Dict[str, Any], result: Dict[str, Any]) -> None:
+        state = chunk["state"]
+        text = chunk["text"]
+        state["parts"][chunk["index"]] = (result, text[len(text.rstrip()):])
+        state["remaining"] -= 1
+        if state["remaining"]:
+            return
+        combined = _combine(state["parts"])
+        latency = time.monotonic() - started
+        latencies.setdefault(state["priority"], []).append(latency)
+        if combined.get("error"):
+            stats[state["priority"]]["failed"] += 1
+        if on_result is not None:
+            await on_result(state["item"], combined, latency)
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+
+    async def run_chunk(chunk: Dict[str, Any]) -> None:
+        result = await loop.run_in_executor(executor, translate, chunk["state"]["item"], chunk["text"].strip())
+        await finish(chunk, result)
+
+    active: set[asyncio.Future] = set()
+    try:
+        while queue:
+            if deadline is not None and deadline - time.monotonic() < MIN_ATTEMPT_SECS:
+                break
+            if len(active) >= max(1, min(capacity(), max_workers)):
+                done, active = await asyncio.wait(
+                    active, timeout=DISPATCH_POLL_SECS, return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    task.result()
+                continue
+            active.add(asyncio.ensure_future(run_chunk(queue.pop())))
+        if active:
+            done, _ = await asyncio.wait(active)
+            for task in done:
+                task.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if queue:
+        logger.warning("Run deadline reached: cancelled %d chunks that had not started", len(queue))
+    while queue:
+        await finish(queue.pop(), CANCELLED_RESULT)
+
+    for priority, class_stats in stats.items():
+        values = latencies.get(priority, [])
+        class_stats.update(
+            first_result_secs=round(min(values, default=0.0), 3),
+            latency_p50_secs=round(percentile(values, 50), 3),
+            latency_p95_secs=round(percentile(values, 95), 3),
+            latency_max_secs=round(max(values, default=0.0), 3),
+        )
+    return {name: stats[name] for name in PRIORITY_CLASSES if name in stats}
@@ -11,10 +11,12 @@ import json
 import logging
 import os
 import time
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
 import httpx
 
+from .concurrency import get_limiter
+from .keys import KeyPool
 from .pricing import calculate_billing
 from .validation import sanitize_error
 
@@ -43,6 +45,14 @@ SYSTEM_PROMPT = (
     "Preserve the original meaning, tone, and formatting."
 )
 
+# Appended when a fuzzy translation-memory match is available
+POST_EDIT_PROMPT = (
+    " A similar text was translated before."
+    "\n\nPrevious source:\n{source}\n\nPrevious translation:\n{target}\n\n"
+    "Post-edit the previous translation so it translates the user's text exactly. "
+    "Keep its wording and terminology wherever the two source texts agree."
+)
+
 LANGUAGE_NAMES: dict[str, str] = {
     "en": "English", "es": "Spanish", "fr": "French", "de": "German",
     "it": "Italian", "pt": "Portuguese", "nl": "Dutch", "ru": "Russian",
@@ -64,6 +74,85 @@ def _get_language_name(code: str) -> str:
     return LANGUAGE_NAMES.get(code.lower(), code)
 
 
+def _post_edit_instructions(reference: Dict[str, str] | None) -> str:
+    """Return the post-edit prompt suffix for a translation-memory match, if any."""
+    if not reference:
+        return ""
+    return POST_EDIT_PROMPT.format(source=reference["source"], target=reference["target"])
+
+
+# ---------------------------------------------------------------------------
+# Request helpers (deadline = absolute time.monotonic() timestamp)
+# ---------------------------------------------------------------------------
+
+MIN_ATTEMPT_SECS = 1.0  # never start an attempt with less time than this left
+
+
+def _out_of_time(deadline: float | None) -> bool:
+    """True if no attempt can be started before the deadline."""
+    return deadline is not None and deadline - time.monotonic() < MIN_ATTEMPT_SECS
+
+
+def _backoff(attempt: int, deadline: float | None) -> float:
+    """Retry backoff, trimmed so the next attempt still fits before the deadline."""
+    wait = min(2 ** attempt, 10)
+    if deadline is not None:
+        wait = max(0.0, min(wait, deadline - time.monotonic() - MIN_ATTEMPT_SECS))
+    return wait
+
+
+def _deadline_error(provider_name: str, last_error: str) -> str:
+    message = f"{provider_name} deadline exceeded before the request could complete."
+    return f"{message} Last error: {last_error}" if last_error else message
+
+
+def _post(
+    authorize: Callable[[str], tuple[str, dict[str, Any], dict[str, str]]],
+    timeout: float,
+    limiter_key: tuple[str, str, str | None],
+    key_pool: KeyPool,
+    size: int = 0,
+    deadline: float | None = None,
+) -> httpx.Response:
+    """
+    POST one request holding a slot of the provider's adaptive limiter and a key from the pool.
+
+    `authorize(key)` returns the (url, payload, headers) to send with that key.
+    Waiting for a key or a slot is bounded by the deadline; running out of time
+    (or of usable keys) raises httpx.PoolTimeout so callers handle it like any
+    other transport error.
+    """
+    def _wait_budget() -> float | None:
+        return None if deadline is None else max(0.0, deadline - time.monotonic() - MIN_ATTEMPT_SECS)
+
+    # Take the limiter slot first, so threads queued behind the limit do not
+    # hold a key (and its rate budget) that may be cooled down or benched meanwhile
+    limiter = get_limiter(*limiter_key)
+    if not limiter.acquire(_wait_budget()):
+        raise httpx.PoolTimeout("Timed out waiting for a concurrency slot before the deadline.")
+    key = key_pool.acquire(_wait_budget())
+    if key is None:
+        limiter.cancel()
+        if key_pool.exhausted():
+            raise httpx.PoolTimeout("All API keys were rejected by the provider (401/403).")
+        raise httpx.PoolTimeout("No API key became available before the deadline.")
+
+    status_code = None
+    start = time.monotonic()
+    try:
+        url, payload, headers = authorize(key)
+        # Time spent waiting for the slot and key comes out of this attempt's budget
+        if deadline is not None:
+            timeout = max(0.1, min(timeout, deadline - time.monotonic()))
+        with httpx.Client(timeout=timeout) as client:
+            response = client.post(url, json=payload, headers=headers)
+        status_code = response.status_code
+    finally:
+        key_pool.release(key, status_code)
+        limiter.release(status_code, time.monotonic() - start, size)
+    return response
+
+
 # ---------------------------------------------------------------------------
 # Provider implementations
 # ---------------------------------------------------------------------------
@@ -77,11 +166,13 @@ def _translate_libretranslate(
     endpoint: str | None = None,
     timeout: int = 30,
     max_retries: int = 3,
+    deadline: float | None = None,
+    key_pool: KeyPool | None = None,
     **kwargs: Any,
 ) -> Dict[str, Any]:
     """Translate via LibreTranslate."""
     url = endpoint or DEFAULT_ENDPOINTS["libretranslate"]
-    resolved_key = api_key or os.environ.get("LIBRETRANSLATE_API_KEY", "")
+    pool = key_pool or KeyPool([api_key or os.environ.get("LIBRETRANSLATE_API_KEY", "")])
 
     headers: dict[str, str] = {"Content-Type": "application/json"}
 
@@ -90,14 +181,18 @@ def _translate_libretranslate(
         "source": source_language,
         "target": target_language,
         "format": "text",
-        "api_key": resolved_key,
     }
 
+    def _authorize(key: str) -> tuple[str, dict[str, Any], dict[str, str]]:
+        return url, {**payload, "api_key": key}, headers
+
     last_error = ""
     for attempt in range(max_retries):
+        if _out_of_time(deadline):
+            last_error = _deadline_error("LibreTranslate", last_error)
+            break
         try:
-            with httpx.Client(timeout=timeout) as client:
-                response = client.post(url, json=payload, headers=headers)
+            response = _post(_authorize, timeout, ("libretranslate", "", endpoint), pool, len(text), deadline)
 
             if response.status_code == 200:
                 data = response.json()
@@ -124,11 +219,16 @@ def _translate_libretranslate(
             if response.status_code == 400:
                 return {"error": "LibreTranslate returned 400: check that language codes are supported."}
             if response.status_code in (401, 403):
-                return {"error": "LibreTranslate authentication failed. Check your API key."}
+                if pool.exhausted():
+                    return {"error": "LibreTranslate authentication failed. Check your API key."}
+                last_error = "LibreTranslate authentication failed for one of the API keys."
+                continue
             if response.status_code == 429:
-                wait = min(2 ** attempt, 10)
-                logger.warning("LibreTranslate rate limited, retrying in %ss...", wait)
-                time.sleep(wait)
+                # With several keys the pool cools this key down; retry at once only if another is ready
+                wait = 0.0 if len(pool.keys) > 1 and pool.has_ready_key() else _backoff(attempt, deadline)
+                logger.warning("LibreTranslate rate limited, retrying in %.1fs...", wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"LibreTranslate rate limited (429) after {max_retries} attempts."
                 continue
 
@@ -136,10 +236,10 @@ def _translate_libretranslate(
             logger.error("LibreTranslate error %s: %s", response.status_code, response.text[:200])
 
         except httpx.HTTPError as exc:
-            last_error = sanitize_error(f"LibreTranslate request failed: {exc}", api_key)
+            last_error = sanitize_error(f"LibreTranslate request failed: {exc}", pool.keys)
             logger.exception("LibreTranslate request failed")
             if attempt < max_retries - 1:
-                time.sleep(min(2 ** attempt, 10))
+                time.sleep(_backoff(attempt, deadline))
 
     return {"error": last_error}
 
@@ -154,19 +254,23 @@ def _translate_openai(
     temperature: float = 0,
     timeout: int = 30,
     max_retries: int = 3,
+    reference: Dict[str, str] | None = None,
+    deadline: float | None = None,
+    key_pool: KeyPool | None = None,
     **kwargs: Any,
 ) -> Dict[str, Any]:
     """Translate via OpenAI Chat Completions API."""
     url = endpoint or DEFAULT_ENDPOINTS["openai"]
+    pool = key_pool or KeyPool([api_key])
     target_name = _get_language_name(target_language)
 
     system_msg = SYSTEM_PROMPT.format(target_language=target_name)
     if source_language and source_language != "auto":
         source_name = _get_language_name(source_language)
         system_msg += f" The source language is {source_name}."
+    system_msg += _post_edit_instructions(reference)
 
     headers = {
-        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
 
@@ -179,11 +283,16 @@ def _translate_openai(
         "temperature": temperature,
     }
 
+    def _authorize(key: str) -> tuple[str, dict[str, Any], dict[str, str]]:
+        return url, payload, {**headers, "Authorization": f"Bearer {key}"}
+
     last_error = ""
     for attempt in range(max_retries):
+        if _out_of_time(deadline):
+            last_error = _deadline_error("OpenAI", last_error)
+            break
         try:
-            with httpx.Client(timeout=timeout) as client:
-                response = client.post(url, json=payload, headers=headers)
+            response = _post(_authorize, timeout, ("openai", model, endpoint), pool, len(text), deadline)
 
             if response.status_code == 200:
                 data = response.json()
@@ -204,28 +313,34 @@ def _translate_openai(
                     "model_used": model,
                 }
 
-            if response.status_code == 401:
-                return {"error": sanitize_error("OpenAI authentication failed. Check your API key.", api_key)}
+            if response.status_code in (401, 403):
+                if pool.exhausted():
+                    return {"error": sanitize_error("OpenAI authentication failed. Check your API key.", pool.keys)}
+                last_error = "OpenAI authentication failed for one of the API keys."
+                continue
             if response.status_code == 429:
-                wait = min(2 ** attempt, 10)
-                logger.warning("OpenAI rate limited, retrying in %ss...", wait)
-                time.sleep(wait)
+                # With several keys the pool cools this key down; retry at once only if another is ready
+                wait = 0.0 if len(pool.keys) > 1 and pool.has_ready_key() else _backoff(attempt, deadline)
+                logger.warning("OpenAI rate limited, retrying in %.1fs...", wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"OpenAI rate limited (429) after {max_retries} attempts."
                 continue
             if response.status_code >= 500:
-                wait = min(2 ** attempt, 10)
+                wait = _backoff(attempt, deadline)
                 logger.warning("OpenAI server error %s, retrying...", response.status_code)
-                time.sleep(wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"OpenAI server error {response.status_code}."
                 continue
 
-            last_error = sanitize_error(f"OpenAI error {response.status_code}: {response.text[:200]}", api_key)
+            last_error = sanitize_error(f"OpenAI error {response.status_code}: {response.text[:200]}", pool.keys)
 
         except httpx.HTTPError as exc:
-            last_error = sanitize_error(f"OpenAI request failed: {exc}", api_key)
+            last_error = sanitize_error(f"OpenAI request failed: {exc}", pool.keys)
             logger.exception("OpenAI request failed")
             if attempt < max_retries - 1:
-                time.sleep(min(2 ** attempt, 10))
+                time.sleep(_backoff(attempt, deadline))
 
     return {"error": last_error}
 
@@ -240,19 +355,23 @@ def _translate_anthropic(
     temperature: float = 0,
     timeout: int = 30,
     max_retries: int = 3,
+    reference: Dict[str, str] | None = None,
+    deadline: float | None = None,
+    key_pool: KeyPool | None = None,
     **kwargs: Any,
 ) -> Dict[str, Any]:
     """Translate via Anthropic Messages API."""
     url = endpoint or DEFAULT_ENDPOINTS["anthropic"]
+    pool = key_pool or KeyPool([api_key])
     target_name = _get_language_name(target_language)
 
     system_msg = SYSTEM_PROMPT.format(target_language=target_name)
     if source_language and source_language != "auto":
         source_name = _get_language_name(source_language)
         system_msg += f" The source language is {source_name}."
+    system_msg += _post_edit_instructions(reference)
 
     headers = {
-        "x-api-key": api_key,
         "anthropic-version": "2023-06-01",
         "Content-Type": "application/json",
     }
@@ -267,11 +386,16 @@ def _translate_anthropic(
         "temperature": temperature,
     }
 
+    def _authorize(key: str) -> tuple[str, dict[str, Any], dict[str, str]]:
+        return url, payload, {**headers, "x-api-key": key}
+
     last_error = ""
     for attempt in range(max_retries):
+        if _out_of_time(deadline):
+            last_error = _deadline_error("Anthropic", last_error)
+            break
         try:
-            with httpx.Client(timeout=timeout) as client:
-                response = client.post(url, json=payload, headers=headers)
+            response = _post(_authorize, timeout, ("anthropic", model, endpoint), pool, len(text), deadline)
 
             if response.status_code == 200:
                 data = response.json()
@@ -296,28 +420,34 @@ def _translate_anthropic(
                     "model_used": model,
                 }
 
-            if response.status_code == 401:
-                return {"error": sanitize_error("Anthropic authentication failed. Check your API key.", api_key)}
+            if response.status_code in (401, 403):
+                if pool.exhausted():
+                    return {"error": sanitize_error("Anthropic authentication failed. Check your API key.", pool.keys)}
+                last_error = "Anthropic authentication failed for one of the API keys."
+                continue
             if response.status_code == 429:
-                wait = min(2 ** attempt, 10)
-                logger.warning("Anthropic rate limited, retrying in %ss...", wait)
-                time.sleep(wait)
+                # With several keys the pool cools this key down; retry at once only if another is ready
+                wait = 0.0 if len(pool.keys) > 1 and pool.has_ready_key() else _backoff(attempt, deadline)
+                logger.warning("Anthropic rate limited, retrying in %.1fs...", wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"Anthropic rate limited (429) after {max_retries} attempts."
                 continue
             if response.status_code >= 500:
-                wait = min(2 ** attempt, 10)
+                wait = _backoff(attempt, deadline)
                 logger.warning("Anthropic server error %s, retrying...", response.status_code)
-                time.sleep(wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"Anthropic server error {response.status_code}."
                 continue
 
-            last_error = sanitize_error(f"Anthropic error {response.status_code}: {response.text[:200]}", api_key)
+            last_error = sanitize_error(f"Anthropic error {response.status_code}: {response.text[:200]}", pool.keys)
 
         except httpx.HTTPError as exc:
-            last_error = sanitize_error(f"Anthropic request failed: {exc}", api_key)
+            last_error = sanitize_error(f"Anthropic request failed: {exc}", pool.keys)
             logger.exception("Anthropic request failed")
             if attempt < max_retries - 1:
-                time.sleep(min(2 ** attempt, 10))
+                time.sleep(_backoff(attempt, deadline))
 
     return {"error": last_error}
 
@@ -332,17 +462,21 @@ def _translate_gemini(
     temperature: float = 0,
     timeout: int = 30,
     max_retries: int = 3,
+    reference: Dict[str, str] | None = None,
+    deadline: float | None = None,
+    key_pool: KeyPool | None = None,
     **kwargs: Any,
 ) -> Dict[str, Any]:
     """Translate via Google Gemini generateContent API."""
     base_url = endpoint or DEFAULT_ENDPOINTS["gemini"]
-    url = f"{base_url}/{model}:generateContent?key={api_key}"
+    pool = key_pool or KeyPool([api_key])
 
     target_name = _get_language_name(target_language)
     prompt = SYSTEM_PROMPT.format(target_language=target_name)
     if source_language and source_language != "auto":
         source_name = _get_language_name(source_language)
         prompt += f" The source language is {source_name}."
+    prompt += _post_edit_instructions(reference)
     prompt += f"\n\nText to translate:\n{text}"
 
     headers = {"Content-Type": "application/json"}
@@ -356,11 +490,16 @@ def _translate_gemini(
         },
     }
 
+    def _authorize(key: str) -> tuple[str, dict[str, Any], dict[str, str]]:
+        return f"{base_url}/{model}:generateContent?key={key}", payload, headers
+
     last_error = ""
     for attempt in range(max_retries):
+        if _out_of_time(deadline):
+            last_error = _deadline_error("Gemini", last_error)
+            break
         try:
-            with httpx.Client(timeout=timeout) as client:
-                response = client.post(url, json=payload, headers=headers)
+            response = _post(_authorize, timeout, ("gemini", model, endpoint), pool, len(text), deadline)
 
             if response.status_code == 200:
                 data = response.json()
@@ -388,29 +527,35 @@ def _translate_gemini(
                 }
 
             if response.status_code == 400:
-                return {"error": sanitize_error(f"Gemini returned 400: {response.text[:200]}", api_key)}
-            if response.status_code == 401 or response.status_code == 403:
-                return {"error": sanitize_error("Gemini authentication failed. Check your API key.", api_key)}
+                return {"error": sanitize_error(f"Gemini returned 400: {response.text[:200]}", pool.keys)}
+            if response.status_code in (401, 403):
+                if pool.exhausted():
+                    return {"error": sanitize_error("Gemini authentication failed. Check your API key.", pool.keys)}
+                last_error = "Gemini authentication failed for one of the API keys."
+                continue
             if response.status_code == 429:
-                wait = min(2 ** attempt, 10)
-                logger.warning("Gemini rate limited, retrying in %ss...", wait)
-                time.sleep(wait)
+                # With several keys the pool cools this key down; retry at once only if another is ready
+                wait = 0.0 if len(pool.keys) > 1 and pool.has_ready_key() else _backoff(attempt, deadline)
+                logger.warning("Gemini rate limited, retrying in %.1fs...", wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"Gemini rate limited (429) after {max_retries} attempts."
                 continue
             if response.status_code >= 500:
-                wait = min(2 ** attempt, 10)
+                wait = _backoff(attempt, deadline)
                 logger.warning("Gemini server error %s, retrying...", response.status_code)
-                time.sleep(wait)
+                if attempt < max_retries - 1:
+                    time.sleep(wait)
                 last_error = f"Gemini server error {response.status_code}."
                 continue
 
-            last_error = sanitize_error(f"Gemini error {response.status_code}: {response.text[:200]}", api_key)
+            last_error = sanitize_error(f"Gemini error {response.status_code}: {response.text[:200]}", pool.keys)
 
         except httpx.HTTPError as exc:
-            last_error = sanitize_error(f"Gemini request failed: {exc}", api_key)
+            last_error = sanitize_error(f"Gemini request failed: {exc}", pool.keys)
             logger.exception("Gemini request failed")
             if attempt < max_retries - 1:
-                time.sleep(min(2 ** attempt, 10))
+                time.sleep(_backoff(attempt, deadline))
 
     return {"error": last_error}
 
@@ -438,8 +583,23 @@ def translate_text(
     temperature: float = 0,
     timeout: int = 30,
     max_retries: int = 3,
+    reference: Dict[str, str] | None = None,
+    deadline: float | None = None,
+    key_pool: KeyPool | None = None,
 ) -> Dict[str, Any]:
-    """Route translation to the selected provider."""
+    """
+    Route translation to the selected provider.
+
+    `reference` ({'source', 'target'}) is a similar, previously translated segment
+    from the translation memory; LLM providers post-edit it instead of translating
+    from scratch. LibreTranslate ignores it.
+
+    `deadline` (a time.monotonic() timestamp) bounds the whole call: each attempt's
+    timeout and backoff are trimmed to the remaining budget and no attempt is
+    started once less than MIN_ATTEMPT_SECS is left.
+
+    `key_pool` spreads requests over several API keys; without it, `api_key` is used.
+    """
     fn = PROVIDER_FUNCTIONS.get(provider)
     if not fn:
         return {"error": f"Unknown provider: {provider}"}
@@ -451,11 +611,14 @@ def translate_text(
         "api_key": api_key,
         "timeout": timeout,
         "max_retries": max_retries,
+        "deadline": deadline,
+        "key_pool": key_pool,
     }
 
     if provider != "libretranslate":
         kwargs["model"] = model or ""
         kwargs["temperature"] = temperature
+        kwargs["reference"] = reference
 
     if endpoint:
         kwargs["endpoint"] = endpoint
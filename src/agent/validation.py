@@ -7,6 +7,7 @@ Provider/model whitelists, key format checks, endpoint validation, and input san
 from __future__ import annotations
 
 import re
+from typing import Any
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -68,6 +69,13 @@ ISO_CODE_PATTERN = re.compile(r"^[a-z]{2}(-[a-zA-Z]{2,4})?$")
 MAX_TEXT_LENGTH = 10_000
 LIBRETRANSLATE_CHAR_LIMIT = 2_000  # libretranslate.com managed service limit
 
+LOCALIZATION_FORMATS = ("po", "xliff", "srt", "vtt")
+MAX_LOCALIZATION_FILE_LENGTH = 5_000_000
+MAX_CONCURRENCY = 32
+MIN_DEADLINE_SECS = 5
+PRIORITY_CLASSES = ("interactive", "normal", "bulk")  # highest first
+MAX_ITEMS = 10_000
+
 
 # ---------------------------------------------------------------------------
 # Validation functions
@@ -96,14 +104,28 @@ def validate_model(provider: str, model: str | None) -> tuple[str, str | None]:
     return model, None
 
 
-def validate_api_key(provider: str, api_key: str | None) -> str | None:
-    """Return error message if API key is missing when required."""
-    if not api_key or not api_key.strip():
+def validate_api_key(provider: str, api_key: str | None, api_keys: list[str] | None = None) -> str | None:
+    """Return error message if API key is missing when required, or a pooled key is malformed."""
+    if api_keys is not None and (
+        not isinstance(api_keys, list) or not all(isinstance(key, str) and key.strip() for key in api_keys)
+    ):
+        return "api_keys must be a list of non-empty strings."
+
+    if (not api_key or not api_key.strip()) and not api_keys:
         return f"API key is required for provider '{provider}'."
 
     return None
 
 
+def validate_requests_per_minute(requests_per_minute: int | None) -> str | None:
+    """Return error if the per-key request budget is invalid (None means unlimited)."""
+    if requests_per_minute is None:
+        return None
+    if isinstance(requests_per_minute, bool) or not isinstance(requests_per_minute, int) or requests_per_minute < 1:
+        return f"Invalid per-key requests per minute '{requests_per_minute}'. Must be a positive integer."
+    return None
+
+
 def validate_endpoint(provider: str, endpoint: str | None) -> str | None:
     """Validate custom endpoint against allowed host patterns. Returns error or None."""
     if not endpoint:
@@ -155,13 +177,70 @@ def validate_text(text: str, provider: str = "", endpoint: str | None = None) ->
     return None
 
 
+def validate_localization_file(content: str, file_format: str) -> str | None:
+    """Return error if the localization file or its format is invalid."""
+    if file_format not in LOCALIZATION_FORMATS:
+        return f"Invalid localization format '{file_format}'. Must be one of: {', '.join(LOCALIZATION_FORMATS)}."
+    if not content or not content.strip():
+        return "No localization file content provided in input."
+    if len(content) > MAX_LOCALIZATION_FILE_LENGTH:
+        return (
+            f"Localization file exceeds maximum length of {MAX_LOCALIZATION_FILE_LENGTH} characters "
+            f"({len(content)} provided)."
+        )
+    return None
+
+
+def validate_items(items: Any) -> str | None:
+    """Return error if the multi-item input is malformed."""
+    if not isinstance(items, list) or not items:
+        return "Items must be a non-empty list of objects with a 'text' field."
+    if len(items) > MAX_ITEMS:
+        return f"Too many items ({len(items)} provided). Maximum is {MAX_ITEMS} per run."
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+            return f"Item {position} must be an object with a 'text' string."
+        for field in ("source_language", "target_language"):
+            if item.get(field) is not None and not isinstance(item[field], str):
+                return f"Item {position} has invalid {field} '{item[field]}'. Must be a language code string."
+        priority = item.get("priority", "normal")
+        if priority not in PRIORITY_CLASSES:
+            return f"Item {position} has invalid priority '{priority}'. Must be one of: {', '.join(PRIORITY_CLASSES)}."
+    return None
+
+
+def validate_concurrency(concurrency: int) -> str | None:
+    """Return error if the concurrency level is out of range."""
+    if not isinstance(concurrency, int) or not 1 <= concurrency <= MAX_CONCURRENCY:
+        return f"Invalid concurrency '{concurrency}'. Must be an integer between 1 and {MAX_CONCURRENCY}."
+    return None
+
+
+def validate_deadline(deadline_secs: int | None) -> str | None:
+    """Return error if the total deadline is invalid (None means no deadline)."""
+    if deadline_secs is None:
+        return None
+    if isinstance(deadline_secs, bool) or not isinstance(deadline_secs, (int, float)) or deadline_secs < MIN_DEADLINE_SECS:
+        return f"Invalid deadline '{deadline_secs}'. Must be at least {MIN_DEADLINE_SECS} seconds."
+    return None
+
+
+def validate_fuzzy_threshold(threshold: float) -> str | None:
+    """Return error if the fuzzy-match threshold is out of range."""
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0.5 <= threshold <= 1:
+        return f"Invalid fuzzy threshold '{threshold}'. Must be a number between 0.5 and 1."
+    return None
+
+
 def sanitize_text(text: str) -> str:
     """Strip null bytes and problematic control characters, preserve newlines/tabs."""
     return text.replace("\x00", "")
 
 
-def sanitize_error(message: str, api_key: str | None = None) -> str:
-    """Remove API key from error messages to prevent leakage."""
-    if api_key and api_key in message:
-        message = message.replace(api_key, "[REDACTED]")
+def sanitize_error(message: str, api_key: str | list[str] | None = None) -> str:
+    """Remove API key(s) from error messages to prevent leakage."""
+    keys = [api_key] if isinstance(api_key, str) else api_key or []
+    for key in keys:
+        if key and key in message:
+            message = message.replace(key, "[REDACTED]")
     return message